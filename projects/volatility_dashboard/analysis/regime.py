@@ -2,7 +2,8 @@
 # analysis/regime.py
 
 from enum import Enum
-from typing import List, Tuple
+from typing import List, Tuple, Optional
+from dataclasses import dataclass
 import numpy as np
 import pandas as pd
 from scipy import stats
@@ -13,6 +14,12 @@ class VolatilityRegime(Enum):
     HIGH = 'High Volatility'
     EXTREME = 'Extreme Volatility'
 
+@dataclass
+class RegimeRuns:
+    runs: pd.DataFrame               # One row per run: regime, start, end, length, start_date, end_date
+    average_duration: pd.Series      # Mean run length per regime (0 if never visited)
+    transition_counts: pd.DataFrame  # Day-to-day transitions, from regime (rows) to regime (columns)
+
 class RegimeDetector:
     def __init__(self, 
                  volatility: pd.Series,
@@ -21,6 +28,7 @@ class RegimeDetector:
         self.volatility = volatility
         self.lookback = lookback
         self.smooth_window = smooth_window
+        self.regime_runs: Optional[RegimeRuns] = None
         
     def detect_regimes(self) -> Tuple[pd.Series, pd.DataFrame]:
         """Detect volatility regimes using statistical approach"""
@@ -35,19 +43,69 @@ class RegimeDetector:
         z_scores = (smooth_vol - roll_mean) / roll_std
         
         # Classify regimes
-        regimes = pd.Series(index=z_scores.index)
+        regimes = pd.Series(index=z_scores.index, dtype=object)
         regimes[z_scores <= -1] = VolatilityRegime.LOW.value
         regimes[(z_scores > -1) & (z_scores <= 1)] = VolatilityRegime.NORMAL.value
         regimes[(z_scores > 1) & (z_scores <= 2)] = VolatilityRegime.HIGH.value
         regimes[z_scores > 2] = VolatilityRegime.EXTREME.value
         
-        # Calculate regime statistics
-        regime_stats = self.calculate_regime_statistics(regimes)
+        # Encode regime runs once and derive statistics from them
+        self.regime_runs = self.calculate_regime_runs(regimes)
+        regime_stats = self.calculate_regime_statistics(regimes, self.regime_runs)
         
         return regimes, regime_stats
         
-    def calculate_regime_statistics(self, regimes: pd.Series) -> pd.DataFrame:
+    def calculate_regime_runs(self, regimes: pd.Series) -> RegimeRuns:
+        """Run-length encode regimes: durations and transitions in one pass"""
+        labels = [regime.value for regime in VolatilityRegime]
+        codes = pd.Categorical(regimes, categories=labels).codes  # -1 where undefined
+        n_regimes = len(labels)
+        
+        # A run starts wherever the code changes
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=int)
+        ends = np.r_[starts[1:] - 1, len(codes) - 1] if len(codes) else starts
+        run_codes = codes[starts] if len(codes) else codes
+        
+        # Undefined stretches (e.g. the rolling warm-up) are not runs
+        defined = run_codes >= 0
+        starts, ends, run_codes = starts[defined], ends[defined], run_codes[defined]
+        lengths = ends - starts + 1
+        
+        runs = pd.DataFrame({
+            'regime': np.array(labels, dtype=object)[run_codes],
+            'start': starts,
+            'end': ends,
+            'length': lengths,
+            'start_date': regimes.index[starts],
+            'end_date': regimes.index[ends]
+        })
+        
+        run_count = np.bincount(run_codes, minlength=n_regimes)
+        total_length = np.bincount(run_codes, weights=lengths, minlength=n_regimes)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average_duration = np.where(run_count > 0, total_length / np.maximum(run_count, 1), 0.0)
+        
+        # Consecutive days with both regimes defined
+        source, target = codes[:-1], codes[1:]
+        valid = (source >= 0) & (target >= 0)
+        counts = np.bincount(
+            source[valid] * n_regimes + target[valid],
+            minlength=n_regimes * n_regimes
+        ).reshape(n_regimes, n_regimes)
+        
+        return RegimeRuns(
+            runs=runs,
+            average_duration=pd.Series(average_duration, index=labels),
+            transition_counts=pd.DataFrame(counts, index=labels, columns=labels)
+        )
+        
+    def calculate_regime_statistics(self,
+                                    regimes: pd.Series,
+                                    regime_runs: Optional[RegimeRuns] = None) -> pd.DataFrame:
         """Calculate statistics for each regime"""
+        if regime_runs is None:
+            regime_runs = self.calculate_regime_runs(regimes)
+            
         stats_list = []
         
         for regime in VolatilityRegime:
@@ -63,7 +121,7 @@ class RegimeDetector:
                 'std_volatility': regime_vol.std(),
                 'max_volatility': regime_vol.max(),
                 'min_volatility': regime_vol.min(),
-                'persistence': self.calculate_persistence(regimes, regime.value)
+                'persistence': regime_runs.average_duration[regime.value]
             }
             stats_list.append(regime_stats)
             
@@ -71,18 +129,5 @@ class RegimeDetector:
         
     def calculate_persistence(self, regimes: pd.Series, regime_value: str) -> float:
         """Calculate persistence probability of a regime"""
-        regime_changes = (regimes != regimes.shift(1)).astype(int)
-        regime_durations = []
-        current_duration = 0
-        
-        for i in range(len(regimes)):
-            if regimes.iloc[i] == regime_value:
-                current_duration += 1
-            elif current_duration > 0:
-                regime_durations.append(current_duration)
-                current_duration = 0
-                
-        if current_duration > 0:
-            regime_durations.append(current_duration)
-            
-        return np.mean(regime_durations) if regime_durations else 0
\ No newline at end of file
+        regime_runs = self.calculate_regime_runs(regimes)
+        return regime_runs.average_duration.get(regime_value, 0)
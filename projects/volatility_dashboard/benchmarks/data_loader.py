@@ -0,0 +1,63 @@
+# benchmarks/data_loader.py
+"""
+Batch loading against a simulated provider: concurrent fetches against a
+sequential loop, with failing symbols and the worker limit checked, and
+warm loads of a non-exhaustive provider checked to read only the store
+
+Run from the project root:
+
+    python -m benchmarks.data_loader [symbols] [workers] [delay]
+"""
+
+import sys
+import tempfile
+import time
+import pandas as pd
+
+from data.data_loader import MarketDataLoader
+from data.price_store import PriceStore
+from data.sources import FakeSource
+
+def check_warm_loads(end_date: str = '2024-01-08'):
+    """Repeated loads ending after a weekend (default: a Monday) fetch only once"""
+    source = FakeSource(delay=0.0, exhaustive=False)
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(3):
+            loader = MarketDataLoader(['SYM'], '2023-06-01', end_date, source=source,
+                                      store=PriceStore(directory))
+            data, failures = loader.fetch_batch(['SYM'])
+            assert not failures and data['SYM'].index[-1] < pd.Timestamp(end_date)
+        assert source.calls == 1, source.calls
+
+        # A stale check is fetched again
+        store = PriceStore(directory, tail_ttl=0)
+        MarketDataLoader(['SYM'], '2023-06-01', end_date, source=source, store=store).fetch_batch(['SYM'])
+        assert source.calls == 2, source.calls
+    print(f"3 loads ending {end_date} (a {pd.Timestamp(end_date).day_name()}): 1 fetch")
+
+def run(n_symbols: int = 32, workers: int = 8, delay: float = 0.1):
+    check_warm_loads()
+    symbols = [f'SYM{i}' for i in range(n_symbols)]
+    failing = set(symbols[::10])
+    print(f"{n_symbols} symbols, {len(failing)} failing, {delay:.2f}s per fetch")
+
+    for max_workers in (1, workers):
+        source = FakeSource(delay=delay, failures=failing)
+        with tempfile.TemporaryDirectory() as directory:
+            loader = MarketDataLoader(symbols, '2023-01-01', '2024-01-01', source=source,
+                                      store=PriceStore(directory), max_workers=max_workers)
+            start = time.perf_counter()
+            data, failures = loader.fetch_batch(symbols)
+            elapsed = time.perf_counter() - start
+
+        # Failures are reported per symbol and never stop the rest of the batch
+        assert set(failures) == failing, failures
+        assert list(data) == [symbol for symbol in symbols if symbol not in failing]
+        assert all(not df.empty and 'Rolling_Volatility' in df for df in data.values())
+        # The pool never runs more fetches than it has workers
+        assert source.max_concurrent <= max_workers, source.max_concurrent
+        print(f"  {max_workers:>2} workers: {elapsed:6.2f}s, at most {source.max_concurrent} fetches in flight")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(*[int(arg) for arg in args[:2]], *[float(arg) for arg in args[2:3]])
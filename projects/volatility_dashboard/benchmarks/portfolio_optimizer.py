@@ -0,0 +1,158 @@
+# benchmarks/portfolio_optimizer.py
+"""
+Mean-variance solvers: finite-difference SLSQP against the dedicated QP solvers
+
+Run from the project root:
+
+    python -m benchmarks.portfolio_optimizer [sizes...]
+
+The finite-difference solver needs several minutes per problem at 1000
+assets. Capped problems are first checked against an SLSQP reference.
+The capped max-Sharpe row compares the previous dense SLSQP solve, whose
+n x n cap constraints take seconds at a few hundred assets.
+"""
+
+import sys
+import time
+import numpy as np
+from scipy.optimize import minimize
+
+from portfolio.optimization import (
+    efficient_frontier, max_return_weights, max_sharpe_weights, min_variance_weights,
+    target_volatility_weights
+)
+
+def legacy_optimal_weights(mean: np.ndarray, cov: np.ndarray, risk_free_rate: float,
+                           target_volatility: float = None) -> np.ndarray:
+    """Previous PortfolioOptimizer.calculate_optimal_weights (numerical gradients)"""
+    n_assets = len(mean)
+
+    def portfolio_volatility(weights):
+        return np.sqrt(np.dot(weights.T, np.dot(cov, weights)))
+
+    constraints = [{'type': 'eq', 'fun': lambda x: np.sum(x) - 1}]
+    if target_volatility:
+        constraints.append({'type': 'eq', 'fun': lambda x: portfolio_volatility(x) - target_volatility})
+
+    def objective(weights):
+        return -(np.sum(mean * weights) - risk_free_rate) / portfolio_volatility(weights)
+
+    return minimize(objective, n_assets * [1. / n_assets], method='SLSQP',
+                    bounds=tuple((0, 1) for _ in range(n_assets)), constraints=constraints).x
+
+def random_market(n_assets: int, n_factors: int = 5, seed: int = 42):
+    """Annualized means and a factor-model covariance"""
+    rng = np.random.default_rng(seed)
+    loadings = rng.normal(0, 0.15, (n_assets, n_factors))
+    cov = loadings @ loadings.T + np.diag(rng.uniform(0.02, 0.09, n_assets))
+    mean = 0.02 + 0.3 * np.sqrt(np.diag(cov)) * rng.uniform(0, 1, n_assets)
+    return mean, cov
+
+def slsqp_capped(cov: np.ndarray, max_weight: float, mean: np.ndarray = None,
+                 target_volatility: float = None) -> np.ndarray:
+    """Reference capped solve: minimum variance, or maximum return at a volatility"""
+    n = len(cov)
+    constraints = [{'type': 'eq', 'fun': lambda w: w.sum() - 1, 'jac': lambda w: np.ones(n)}]
+    if target_volatility is None:
+        def objective(w):
+            return w @ cov @ w, 2 * cov @ w
+    else:
+        def objective(w):
+            return -mean @ w, -mean
+        constraints.append({'type': 'ineq', 'fun': lambda w: target_volatility ** 2 - w @ cov @ w,
+                            'jac': lambda w: -2 * cov @ w})
+    return minimize(objective, np.full(n, 1 / n), jac=True, method='SLSQP', bounds=[(0, max_weight)] * n,
+                    constraints=constraints, options={'maxiter': 1000, 'ftol': 1e-14}).x
+
+def slsqp_capped_sharpe(mean: np.ndarray, cov: np.ndarray, risk_free_rate: float,
+                        max_weight: float) -> np.ndarray:
+    """Previous capped max_sharpe_weights: min y'Cy, (mean - rf)'y = 1, y <= max_weight * sum(y)"""
+    n = len(mean)
+    excess = mean - risk_free_rate
+    cap = max_weight * np.ones((n, n)) - np.eye(n)
+    constraints = [{'type': 'eq', 'fun': lambda y: excess @ y - 1, 'jac': lambda y: excess},
+                   {'type': 'ineq', 'fun': lambda y: cap @ y, 'jac': lambda y: cap}]
+    y0 = np.where(excess > 0, 1.0, 0.0)
+    y = minimize(lambda y: (y @ cov @ y, 2 * cov @ y), y0 / (excess @ y0), jac=True, method='SLSQP',
+                 bounds=[(0, None)] * n, constraints=constraints, options={'maxiter': 500, 'ftol': 1e-12}).x
+    y = np.clip(y, 0, None)
+    return y / y.sum()
+
+def check_capped(trials: int = 300, seed: int = 0):
+    """Capped (max_weight < 1) solves must be feasible and match the SLSQP reference"""
+    rng = np.random.default_rng(seed)
+
+    def feasible(w, cap):
+        return np.isfinite(w).all() and abs(w.sum() - 1) < 1e-8 and (w >= -1e-10).all() and (w <= cap + 1e-10).all()
+
+    for _ in range(trials):
+        n = int(rng.integers(5, 60))
+        returns = rng.normal(0.0005, 0.01, (int(rng.integers(n + 5, 4 * n + 20)), n)) * rng.uniform(0.5, 2, n)
+        cov, mean = np.cov(returns.T) * 252, returns.mean(axis=0) * 252
+        cap = rng.uniform(1.05 / n, min(1.0, 4.0 / n))
+
+        weights = min_variance_weights(cov, cap)
+        reference = slsqp_capped(cov, cap)
+        assert feasible(weights, cap), weights.sum()
+        assert weights @ cov @ weights <= reference @ cov @ reference * (1 + 1e-6)
+        floor = weights @ cov @ weights
+
+        target = 0.6 * np.median(np.sqrt(np.diag(cov)))
+        weights = target_volatility_weights(mean, cov, target, cap)
+        reference = slsqp_capped(cov, cap, mean, target)
+        assert feasible(weights, cap), weights.sum()
+        # Targets below the minimum variance give the minimum-variance portfolio
+        assert weights @ cov @ weights <= max(target ** 2, floor) * (1 + 1e-6)
+        if feasible(reference, cap) and reference @ cov @ reference <= target ** 2 * (1 + 1e-6):
+            assert mean @ weights >= mean @ reference - 1e-6 * np.abs(mean).max()
+
+        frontier = efficient_frontier(mean, cov, points=10, max_weight=cap)
+        assert all(feasible(w, cap) for w in frontier.weights)
+
+        if mean @ max_return_weights(mean, cap) > 0:
+            weights = max_sharpe_weights(mean, cov, 0.0, cap)
+            reference = slsqp_capped_sharpe(mean, cov, 0.0, cap)
+            assert feasible(weights, cap), weights.sum()
+            assert sharpe(weights, mean, cov, 0.0) >= sharpe(reference, mean, cov, 0.0) - 1e-6
+    print(f"capped min-var, max-Sharpe, target-vol and frontier feasible and optimal in {trials} random problems")
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def sharpe(weights, mean, cov, risk_free_rate):
+    return (mean @ weights - risk_free_rate) / np.sqrt(weights @ cov @ weights)
+
+def run(sizes=(50, 200, 1000), risk_free_rate: float = 0.03, max_weight: float = 0.05):
+    check_capped()
+    print(f"{'assets':>6} {'problem':>12} {'legacy':>10} {'analytic':>10} {'speedup':>8}  "
+          f"{'legacy Sharpe':>13} {'analytic Sharpe':>15}")
+    for n in sizes:
+        mean, cov = random_market(n)
+
+        _, minvar_time = timed(min_variance_weights, cov)
+        print(f"{n:>6} {'min-var':>12} {'-':>10} {minvar_time * 1000:8.1f}ms")
+
+        legacy, legacy_time = timed(legacy_optimal_weights, mean, cov, risk_free_rate)
+        new, new_time = timed(max_sharpe_weights, mean, cov, risk_free_rate)
+        print(f"{n:>6} {'max-Sharpe':>12} {legacy_time * 1000:8.1f}ms {new_time * 1000:8.1f}ms "
+              f"{legacy_time / new_time:7.0f}x  {sharpe(legacy, mean, cov, risk_free_rate):13.4f} "
+              f"{sharpe(new, mean, cov, risk_free_rate):15.4f}")
+
+        legacy, legacy_time = timed(slsqp_capped_sharpe, mean, cov, risk_free_rate, max_weight)
+        new, new_time = timed(max_sharpe_weights, mean, cov, risk_free_rate, max_weight)
+        print(f"{n:>6} {'capped':>12} {legacy_time * 1000:8.1f}ms {new_time * 1000:8.1f}ms "
+              f"{legacy_time / new_time:7.0f}x  {sharpe(legacy, mean, cov, risk_free_rate):13.4f} "
+              f"{sharpe(new, mean, cov, risk_free_rate):15.4f}")
+
+        minimum = np.sqrt(min_variance_weights(cov) @ cov @ min_variance_weights(cov))
+        target = 1.5 * minimum
+        legacy, legacy_time = timed(legacy_optimal_weights, mean, cov, risk_free_rate, target)
+        new, new_time = timed(target_volatility_weights, mean, cov, target)
+        print(f"{n:>6} {'target-vol':>12} {legacy_time * 1000:8.1f}ms {new_time * 1000:8.1f}ms "
+              f"{legacy_time / new_time:7.0f}x  {sharpe(legacy, mean, cov, risk_free_rate):13.4f} "
+              f"{sharpe(new, mean, cov, risk_free_rate):15.4f}")
+
+if __name__ == "__main__":
+    run(tuple(int(n) for n in sys.argv[1:]) or (50, 200, 1000))
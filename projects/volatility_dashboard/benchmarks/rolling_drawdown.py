@@ -0,0 +1,48 @@
+# benchmarks/rolling_drawdown.py
+"""
+Rolling max drawdown: rolling().apply() against the linear-time version
+
+Run from the project root:
+
+    python -m benchmarks.rolling_drawdown
+"""
+
+import time
+import numpy as np
+import pandas as pd
+
+from utils.helpers import calculate_drawdowns
+from utils.rolling import rolling_max_drawdown
+
+def apply_max_drawdown(returns: pd.Series, window: int) -> pd.Series:
+    """Previous implementation of the max_drawdown rolling metric"""
+    return returns.rolling(window=window).apply(lambda x: calculate_drawdowns(x).min())
+
+def run(years: int = 20, window: int = 252, n_symbols: int = 20, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2000-01-03', periods=years * 252)
+    returns = pd.Series(rng.normal(0.0003, 0.012, len(dates)), index=dates)
+
+    start = time.perf_counter()
+    expected = apply_max_drawdown(returns, window)
+    apply_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = rolling_max_drawdown(returns, window)
+    linear_time = time.perf_counter() - start
+
+    assert np.allclose(expected, result, equal_nan=True)
+
+    panel = pd.DataFrame(rng.normal(0.0003, 0.012, (len(dates), n_symbols)), index=dates)
+    start = time.perf_counter()
+    rolling_max_drawdown(panel, window)
+    panel_time = time.perf_counter() - start
+
+    print(f"{len(dates)} daily returns, {window}-day window")
+    print(f"  rolling().apply():           {apply_time * 1000:10.1f} ms")
+    print(f"  rolling_max_drawdown:        {linear_time * 1000:10.1f} ms "
+          f"({apply_time / linear_time:.0f}x)")
+    print(f"  rolling_max_drawdown, {n_symbols:>3} symbols: {panel_time * 1000:5.1f} ms")
+
+if __name__ == "__main__":
+    run()
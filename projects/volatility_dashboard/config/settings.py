@@ -4,11 +4,15 @@ class Config:
     # Data parameters
     DEFAULT_TIMEFRAME = '1d'
     LOOKBACK_PERIOD = 252  # One trading year
+    PRICE_STORE_DIR = '.cache/prices'  # Local Parquet store of daily bars
+    PRICE_STORE_TAIL_TTL = 900  # Seconds before an already checked tail is fetched again
     
     # Model parameters
     GARCH_P = 1
     GARCH_Q = 1
     CONFIDENCE_LEVEL = 0.95
+    MODEL_CACHE_DIR = '.cache/models'  # Fitted GARCH models and diagnostics
+    MODEL_CACHE_MAX_BYTES = 256 * 1024 ** 2
     
     # Portfolio parameters
     MAX_POSITION_SIZE = 0.2  # 20% of portfolio
@@ -22,6 +26,7 @@ class Config:
     # Risk management
     MAX_DRAWDOWN = 0.25     # 25% maximum drawdown
     RISK_FREE_RATE = 0.03   # 3% risk-free rate
+    COVARIANCE_ESTIMATOR = 'sample'  # 'sample', 'ledoit_wolf' or 'pca' (factor model)
     
     # Regime detection
     REGIME_THRESHOLD = 1.5   # Volatility multiplier for regime change
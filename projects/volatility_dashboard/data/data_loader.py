@@ -3,64 +3,194 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Union
+from typing import List, Dict, Union, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import streamlit as st
 
+from config.settings import Config
+from data.price_store import PriceStore
+from data.sources import DataSource, YahooSource
+
 class MarketDataLoader:
-    def __init__(self, symbols: List[str], start_date: str = None, end_date: str = None):
+    def __init__(self,
+                 symbols: List[str],
+                 start_date: str = None,
+                 end_date: str = None,
+                 source: Optional[DataSource] = None,
+                 store: Optional[PriceStore] = None,
+                 max_workers: int = 8,
+                 vol_window: int = 21):
+        """
+        Parameters:
+        -----------
+        symbols : List[str]
+            Ticker symbols to load
+        start_date, end_date : str, optional
+            Date range as 'YYYY-MM-DD' (default: the last 365 days)
+        source : DataSource, optional
+            Provider used for ranges missing from the store (default: Yahoo)
+        store : PriceStore, optional
+            Local price store read before the source
+            (default: ``Config.PRICE_STORE_DIR``)
+        max_workers : int
+            Maximum number of symbols fetched concurrently
+        vol_window : int
+            Window of the derived 'Rolling_Volatility' column
+        """
         self.symbols = symbols
         self.start_date = start_date or (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
         self.end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+        self.source = source or YahooSource()
+        self.store = store or PriceStore(Config.PRICE_STORE_DIR, Config.PRICE_STORE_TAIL_TTL)
+        self.max_workers = max_workers
+        self.vol_window = vol_window
+        self.failures: Dict[str, str] = {}
+        
+    def _load_symbol(self, symbol: str) -> pd.DataFrame:
+        """Read a symbol from the store, fetching only the ranges it is missing"""
+        for start, end in self.store.missing_ranges(symbol, self.start_date, self.end_date):
+            bars = self.source.fetch(symbol, start, end)
+            self.store.write(symbol, bars, start, end, self.source.exhaustive)
+            
+        return self.store.read(symbol, self.start_date, self.end_date)
+        
+    def _add_derived_columns(self, df: pd.DataFrame, n_new: Optional[int] = None) -> pd.DataFrame:
+        """
+        Compute returns, log returns and rolling volatility for the last
+        ``n_new`` rows (default: all rows)
+        
+        Only the tail needed by the rolling window is read, so extending a
+        long history by a few bars costs as much as the new bars.
+        """
+        n_new = len(df) if n_new is None else n_new
+        if n_new == 0:
+            return df
+            
+        # One extra close for the first return, a full window for the first volatility
+        tail = df['Close'].iloc[-(n_new + self.vol_window):]
+        returns = tail.pct_change()
+        log_returns = np.log(tail/tail.shift(1))
+        volatility = returns.rolling(window=self.vol_window).std() * np.sqrt(252)
+        
+        new_index = df.index[-n_new:]
+        df.loc[new_index, 'Returns'] = returns.iloc[-n_new:].values
+        df.loc[new_index, 'Log_Returns'] = log_returns.iloc[-n_new:].values
+        df.loc[new_index, 'Rolling_Volatility'] = volatility.iloc[-n_new:].values
+        
+        return df
+        
+    def _prepare_symbol(self, symbol: str) -> pd.DataFrame:
+        """Load bars for one symbol and add derived return columns"""
+        df = self._load_symbol(symbol)
+        
+        # Check if we got any data
+        if df.empty:
+            raise ValueError("No data received")
+            
+        return self._add_derived_columns(df)
+        
+    def _refresh_symbol(self, symbol: str, df: pd.DataFrame, end_date: str) -> pd.DataFrame:
+        """Append bars from the last cached timestamp onwards to a cached frame"""
+        last = df.index[-1]
+        start = last.strftime('%Y-%m-%d')
+        
+        bars = self.source.fetch(symbol, start, end_date)
+        self.store.write(symbol, bars, start, end_date, self.source.exhaustive)
+        new = self.store.read(symbol, start, end_date)
+        if new.empty:
+            return df
+            
+        # The last cached bar is fetched again in case it was a partial session
+        history = df.iloc[:-1] if new.index[0] == last else df
+        updated = pd.concat([history, new])
+        
+        return self._add_derived_columns(updated, n_new=len(new))
+        
+    def _run_batch(self, func, jobs: Dict[str, tuple]) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        """Run ``func(symbol, *args)`` for every job on the thread pool"""
+        results, failures = {}, {}
+        if not jobs:
+            return results, failures
+            
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+            futures = {pool.submit(func, symbol, *args): symbol for symbol, args in jobs.items()}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    failures[symbol] = str(e)
+                    
+        data = {symbol: results[symbol] for symbol in jobs if symbol in results}
+        return data, failures
+        
+    def fetch_batch(self, symbols: List[str]) -> Tuple[Dict[str, pd.DataFrame], Dict[str, str]]:
+        """
+        Fetch several symbols concurrently on a bounded thread pool
+        
+        Parameters:
+        -----------
+        symbols : List[str]
+            Symbols to fetch
+            
+        Returns:
+        --------
+        Tuple[Dict[str, pd.DataFrame], Dict[str, str]]
+            Data per successfully loaded symbol (in input order) and the
+            error message per failed symbol. A failing symbol never stops
+            the rest of the batch.
+        """
+        return self._run_batch(self._prepare_symbol, {symbol: () for symbol in symbols})
+        
+    def refresh(self,
+                data: Dict[str, pd.DataFrame],
+                end_date: str = None) -> Dict[str, pd.DataFrame]:
+        """
+        Incrementally update previously loaded data
+        
+        Only bars from each symbol's last cached timestamp onwards are
+        fetched, and the derived columns are extended over the new bars.
+        
+        Parameters:
+        -----------
+        data : Dict[str, pd.DataFrame]
+            Frames returned by an earlier ``fetch_data``/``refresh`` call
+        end_date : str, optional
+            Exclusive end of the refresh (default: tomorrow, so that the
+            session in progress is included)
+            
+        Returns:
+        --------
+        Dict[str, pd.DataFrame]
+            Updated frames. Symbols that fail to refresh keep their cached
+            frame and are recorded in ``self.failures``.
+        """
+        end_date = end_date or (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        jobs = {symbol: (df, end_date) for symbol, df in data.items() if not df.empty}
+        
+        refreshed, self.failures = self._run_batch(self._refresh_symbol, jobs)
+        return {symbol: refreshed.get(symbol, df) for symbol, df in data.items()}
         
     def fetch_data(self) -> Dict[str, pd.DataFrame]:
         """Fetch market data for given symbols"""
-        data = {}
-        
         if not self.symbols:
             st.warning("No symbols selected. Please select at least one symbol.")
             return {}
             
-        st.info(f"Fetching data for {len(self.symbols)} symbols...")
-        
-        for symbol in self.symbols:
-            try:
-                # Show progress
-                st.write(f"Loading data for {symbol}...")
-                
-                # Create ticker object
-                ticker = yf.Ticker(symbol)
-                
-                # Fetch history with progress indicator
-                df = ticker.history(
-                    start=self.start_date,
-                    end=self.end_date,
-                    interval='1d'
-                )
-                
-                # Check if we got any data
-                if df.empty:
-                    st.warning(f"No data received for {symbol}")
-                    continue
-                    
-                # Calculate returns
-                df['Returns'] = df['Close'].pct_change()
-                df['Log_Returns'] = np.log(df['Close']/df['Close'].shift(1))
-                
-                # Store data
-                data[symbol] = df
-                
-                # Show success
-                st.success(f"Successfully loaded data for {symbol}")
-                
-            except Exception as e:
-                st.error(f"Error fetching data for {symbol}: {str(e)}")
-                continue
+        with st.spinner(f"Fetching data for {len(self.symbols)} symbols..."):
+            data, self.failures = self.fetch_batch(self.symbols)
+            
+        if self.failures:
+            st.warning("Could not load: " + ", ".join(
+                f"{symbol} ({error})" for symbol, error in self.failures.items()
+            ))
         
         if not data:
             st.error("Failed to fetch data for any symbols. Please check symbol names and try again.")
             return {}
             
+        st.success(f"Loaded data for {len(data)} of {len(self.symbols)} symbols")
         return data
     
     def get_returns(self, symbol: str) -> pd.Series:
@@ -1,29 +1,91 @@
-
 # data/market_data.py
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Dict, List, Optional
+
+from utils.rolling import RollingStatsEngine, data_version, rolling_engine
 
 class MarketData:
-    def __init__(self, data: Dict[str, pd.DataFrame]):
+    def __init__(self,
+                 data: Dict[str, pd.DataFrame],
+                 fields: List[str] = ('Close', 'Returns'),
+                 engine: Optional[RollingStatsEngine] = None):
+        """
+        Market data for a symbol universe, held as aligned panels
+
+        Parameters:
+        -----------
+        data : Dict[str, pd.DataFrame]
+            Frames per symbol as returned by ``MarketDataLoader``
+        fields : List[str]
+            Columns stored as panels. Each panel is a float64 array of
+            shape (dates, symbols) on the union of all symbols' dates.
+        engine : RollingStatsEngine, optional
+            Rolling statistics engine (default: the shared engine)
+        """
         self.data = data
-        
+        self.symbols = list(data.keys())
+        self.engine = engine or rolling_engine
+        self._build_panels(fields)
+        self.version = data_version(self.panel('Returns')) if 'Returns' in self.panels else None
+
+    def _build_panels(self, fields: List[str]):
+        """Align every field on a shared date index, once"""
+        self.index = pd.DatetimeIndex([])
+        for df in self.data.values():
+            self.index = self.index.union(df.index)
+
+        self.panels: Dict[str, np.ndarray] = {}
+        for field in fields:
+            panel = np.full((len(self.index), len(self.symbols)), np.nan)
+            for j, symbol in enumerate(self.symbols):
+                df = self.data[symbol]
+                if field in df:
+                    rows = self.index.get_indexer(df.index)
+                    panel[rows, j] = df[field].to_numpy(dtype=np.float64)
+            self.panels[field] = panel
+
+        # True where a symbol has a value for a date
+        self.masks = {field: ~np.isnan(panel) for field, panel in self.panels.items()}
+
+    def panel(self, field: str) -> pd.DataFrame:
+        """Dates x symbols frame view of a panel"""
+        return pd.DataFrame(self.panels[field], index=self.index, columns=self.symbols)
+
     def calculate_correlation_matrix(self) -> pd.DataFrame:
         """Calculate correlation matrix of returns"""
-        returns = pd.DataFrame({
-            symbol: data['Returns'] for symbol, data in self.data.items()
-        })
-        return returns.corr()
-    
+        # Pairwise-complete Pearson correlation (as DataFrame.corr) from a
+        # handful of matrix products over the masked panel
+        mask = self.masks['Returns'].astype(np.float64)
+        x = np.where(self.masks['Returns'], self.panels['Returns'], 0.0)
+
+        n = mask.T @ mask
+        sum_x = x.T @ mask          # [i, j]: sum of x_i where both i and j are present
+        sum_xx = (x * x).T @ mask
+        sum_xy = x.T @ x
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = sum_xy - sum_x * sum_x.T / n
+            var = sum_xx - sum_x ** 2 / n
+            corr = cov / np.sqrt(var * var.T)
+        corr[n < 2] = np.nan
+
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
     def calculate_volatility(self, window: int = 30) -> Dict[str, pd.Series]:
         """Calculate rolling volatility for all symbols"""
-        volatilities = {}
-        for symbol, data in self.data.items():
-            volatilities[symbol] = data['Returns'].rolling(window=window).std() * np.sqrt(252)
-        return volatilities
-    
+        volatility = self.engine.rolling(
+            self.panel('Returns'), window, 'std', version=self.version
+        ) * np.sqrt(252)
+        return {
+            symbol: volatility[symbol].reindex(self.data[symbol].index)
+            for symbol in self.symbols
+        }
+
     def get_latest_prices(self) -> pd.Series:
         """Get latest prices for all symbols"""
-        return pd.Series({
-            symbol: data['Close'].iloc[-1] for symbol, data in self.data.items()
-        })
\ No newline at end of file
+        mask = self.masks['Close']
+        # Last row with a price per column
+        last_rows = len(self.index) - 1 - np.argmax(mask[::-1], axis=0)
+        prices = self.panels['Close'][last_rows, np.arange(len(self.symbols))]
+        return pd.Series(prices, index=self.symbols)
@@ -0,0 +1,189 @@
+# data/price_store.py
+
+import os
+import re
+import json
+import threading
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+class PriceStore:
+    def __init__(self, directory: str, tail_ttl: float = 900):
+        """
+        On-disk columnar store of daily bars, one Parquet file per symbol
+
+        Parameters:
+        -----------
+        directory : str
+            Root directory of the store. Created on first write.
+        tail_ttl : float
+            Seconds for which a range past the coverage that the source
+            was already asked about is not fetched again
+
+        Alongside the bar files the store keeps a manifest of the date range
+        that has been requested from the source for every symbol, so that
+        ranges without bars (weekends, holidays) are not fetched again.
+        Coverage of a non-exhaustive source ends at its last bar, so the
+        manifest also records how far and when the tail was last checked:
+        an end date after a weekend, or a delisted symbol, then costs one
+        fetch per ``tail_ttl`` rather than one per load.
+        """
+        self.directory = directory
+        self.tail_ttl = tail_ttl
+        self._manifest_path = os.path.join(directory, 'manifest.json')
+        self._manifest = self._read_manifest()
+        self._lock = threading.Lock()
+
+    def _read_manifest(self) -> Dict[str, List[str]]:
+        if not os.path.exists(self._manifest_path):
+            return {}
+        with open(self._manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        tmp_path = self._manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _path(self, symbol: str) -> str:
+        """Partition file for a symbol ('^GSPC' -> '_GSPC.parquet')"""
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9.\-]', '_', symbol) + '.parquet')
+
+    def coverage(self, symbol: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """Half-open [start, end) range already requested for a symbol"""
+        if symbol not in self._manifest:
+            return None
+        start, end = self._manifest[symbol][:2]
+        return pd.Timestamp(start), pd.Timestamp(end)
+
+    def _tail_checked(self, symbol: str, end: pd.Timestamp) -> bool:
+        """True if the source was asked up to ``end`` less than ``tail_ttl`` seconds ago"""
+        entry = self._manifest.get(symbol, [])
+        if len(entry) < 4:
+            return False
+        checked_end, checked_at = pd.Timestamp(entry[2]), pd.Timestamp(entry[3])
+        return checked_end >= end and (pd.Timestamp.now() - checked_at).total_seconds() < self.tail_ttl
+
+    def last_date(self, symbol: str) -> Optional[pd.Timestamp]:
+        """Date of the last stored bar (reads only the index)"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None
+        index = pd.read_parquet(path, columns=[]).index
+        return index[-1] if len(index) else None
+
+    def missing_ranges(self, symbol: str, start: str, end: str) -> List[Tuple[str, str]]:
+        """
+        Sub-ranges of [start, end) that are not yet covered by the store
+
+        A range past the coverage starts at the last stored bar, so that
+        bar is fetched again whenever the source is asked anyway; a stale
+        partial session left by an older store is replaced that way. It is
+        skipped while a fetch up to ``end`` is less than ``tail_ttl`` old.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        covered = self.coverage(symbol)
+        if covered is None:
+            return [(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))]
+
+        cov_start, cov_end = covered
+        ranges = []
+        if start < cov_start:
+            ranges.append((start.strftime('%Y-%m-%d'), cov_start.strftime('%Y-%m-%d')))
+        if end > cov_end and not self._tail_checked(symbol, end):
+            last = self.last_date(symbol)
+            if last is not None:
+                cov_end = min(cov_end, last)
+            ranges.append((cov_end.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        return ranges
+
+    def read(self, symbol: str, start: str = None, end: str = None) -> pd.DataFrame:
+        """Read stored bars for a symbol, optionally restricted to [start, end)"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+
+        df = pd.read_parquet(path)
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df.index < pd.Timestamp(end)]
+        return df
+
+    def write(self, symbol: str, bars: pd.DataFrame, start: str, end: str, exhaustive: bool = False):
+        """
+        Merge newly fetched bars into the store and extend the symbol's coverage
+
+        Parameters:
+        -----------
+        symbol : str
+            Ticker symbol
+        bars : pd.DataFrame
+            Bars fetched for [start, end); may be empty
+        start, end : str
+            Requested range. It must overlap or touch the current coverage,
+            which is what ``missing_ranges`` returns.
+        exhaustive : bool
+            The source's answer is definitive (``DataSource.exhaustive``),
+            so the whole range is covered even past the last bar. Otherwise
+            coverage ends at the last returned bar, and an empty answer
+            (possibly a transient failure) covers nothing.
+
+        Either way, a fetch reaching past the coverage is recorded as the
+        latest check of the tail (see ``missing_ranges``).
+        """
+        existing = self.read(symbol)
+        if bars.empty and existing.empty:
+            # Nothing known about this symbol yet (possibly a bad ticker),
+            # don't mark the range as covered
+            return
+
+        if not bars.empty:
+            bars = bars.copy()
+            # Store plain calendar dates so that ranges compare cleanly
+            if getattr(bars.index, 'tz', None) is not None:
+                bars.index = bars.index.tz_localize(None)
+            bars.index = pd.DatetimeIndex(bars.index).normalize()
+            bars.index.name = 'Date'
+
+            merged = pd.concat([existing, bars]) if not existing.empty else bars
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(symbol) + '.tmp'
+            merged.to_parquet(tmp_path)
+            os.replace(tmp_path, self._path(symbol))
+
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        requested_end = end
+        if not exhaustive:
+            if bars.empty:
+                end = None
+            else:
+                # A bar dated today may be a session still in progress: leave it
+                # uncovered so that the next load fetches it again
+                last = bars.index[-1]
+                completed = last if last >= pd.Timestamp.now().normalize() else last + pd.Timedelta(days=1)
+                end = min(end, completed)
+
+        # Symbols may be written from several fetch threads at once
+        with self._lock:
+            covered = self.coverage(symbol)
+            if covered is None and end is None:
+                return
+            if end is None:
+                start, end = covered
+            elif covered is not None:
+                start, end = min(start, covered[0]), max(end, covered[1])
+
+            entry = [start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')]
+            previous = self._manifest.get(symbol, [])
+            if requested_end >= end:
+                entry += [requested_end.strftime('%Y-%m-%d'), pd.Timestamp.now().isoformat()]
+            elif len(previous) == 4:
+                entry += previous[2:]
+
+            os.makedirs(self.directory, exist_ok=True)
+            self._manifest[symbol] = entry
+            self._write_manifest()
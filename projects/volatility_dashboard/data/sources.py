@@ -0,0 +1,118 @@
+# data/sources.py
+
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+class DataSource(ABC):
+    """Provider of daily OHLCV bars for a single symbol"""
+
+    # True if a fetch always returns every bar in the range, so an empty
+    # frame means there are none (rather than, possibly, a failed request)
+    exhaustive = False
+
+    @abstractmethod
+    def fetch(self, symbol: str, start: str, end: str) -> pd.DataFrame:
+        """
+        Fetch daily bars for ``symbol`` in the half-open range [start, end)
+
+        Returns:
+        --------
+        pd.DataFrame
+            Bars indexed by date with at least a 'Close' column. An empty
+            frame means the source has no bars in the range.
+        """
+
+class YahooSource(DataSource):
+    """Daily bars from Yahoo Finance"""
+
+    def __init__(self, interval: str = '1d'):
+        self.interval = interval
+
+    def fetch(self, symbol: str, start: str, end: str) -> pd.DataFrame:
+        return yf.Ticker(symbol).history(
+            start=start,
+            end=end,
+            interval=self.interval
+        )
+
+class CSVSource(DataSource):
+    """Daily bars from ``<directory>/<symbol>.csv`` files, e.g. test fixtures"""
+
+    exhaustive = True
+
+    def __init__(self, directory: str, date_column: str = 'Date'):
+        self.directory = directory
+        self.date_column = date_column
+
+    def fetch(self, symbol: str, start: str, end: str) -> pd.DataFrame:
+        path = os.path.join(self.directory, f"{symbol}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame()
+
+        df = pd.read_csv(path, parse_dates=[self.date_column], index_col=self.date_column)
+        df = df.sort_index()
+        return df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))]
+
+class FakeSource(DataSource):
+    """
+    Synthetic daily bars after a simulated network delay, for exercising
+    the loader without a provider
+
+    Parameters:
+    -----------
+    delay : float
+        Seconds every fetch sleeps before returning
+    failures : Iterable[str]
+        Symbols whose fetches raise, like a provider error
+    seed : int
+        Base seed; each symbol's random walk is the same on every fetch
+    exhaustive : bool
+        Whether to act as an exhaustive source (``DataSource.exhaustive``);
+        False mimics a provider such as Yahoo
+
+    ``calls`` counts fetches and ``max_concurrent`` records the most
+    fetches that were in flight at once.
+    """
+
+    exhaustive = True
+
+    def __init__(self, delay: float = 0.1, failures: Iterable[str] = (), seed: int = 0,
+                 exhaustive: bool = True):
+        self.delay = delay
+        self.exhaustive = exhaustive
+        self.failures = set(failures)
+        self.seed = seed
+        self.calls = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, symbol: str, start: str, end: str) -> pd.DataFrame:
+        with self._lock:
+            self.calls += 1
+            self._active += 1
+            self.max_concurrent = max(self.max_concurrent, self._active)
+        try:
+            time.sleep(self.delay)
+            if symbol in self.failures:
+                raise ConnectionError(f"Simulated failure for {symbol}")
+
+            # A fixed walk from 2000 onwards, so overlapping ranges agree
+            days = np.arange(np.datetime64('2000-01-03'), np.datetime64(pd.Timestamp(end).date()))
+            dates = days[np.is_busday(days)]
+            rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+            close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(dates))))
+            df = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                               'Volume': 1_000_000.0}, index=pd.DatetimeIndex(dates, name='Date'))
+            return df[df.index >= pd.Timestamp(start)]
+        finally:
+            with self._lock:
+                self._active -= 1
@@ -3,6 +3,8 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from typing import Dict, List
 
@@ -12,6 +14,8 @@ from data.data_loader import MarketDataLoader
 from models.volatility import VolatilityAnalyzer
 from models.risk_metrics import RiskAnalyzer
 from models.garch import GarchModel
+from models.cache import ModelCache
+from models.garch_batch import fit_garch_batch, garch_pool
 from portfolio.risk_manager import PortfolioRiskManager
 from portfolio.optimization import PortfolioOptimizer
 from visualization.dashboard import VolatilityDashboard
@@ -31,46 +35,87 @@ def initialize_session_state():
         st.session_state.analysis_mode = 'Basic'
 
 def load_market_data(symbols: List[str], timeframe: str) -> Dict:
-    """Load and process market data with error handling"""
+    """Load and process market data with error handling
+    
+    The first load for a symbol set reads the full history; later reruns
+    only append the bars that arrived since, at most every
+    ``Config.UPDATE_INTERVAL`` seconds.
+    """
     try:
         data_loader = MarketDataLoader(symbols)
-        market_data = data_loader.fetch_data()
+        cached = st.session_state.get('market_data_cache')
+        
+        if cached is not None and cached['symbols'] == tuple(symbols):
+            market_data = cached['data']
+            if (datetime.now() - cached['updated']).total_seconds() >= Config.UPDATE_INTERVAL:
+                market_data = data_loader.refresh(market_data)
+        else:
+            market_data = data_loader.fetch_data()
         
         if not market_data:
             st.error("Failed to fetch market data. Please check your internet connection.")
             return None
             
+        if cached is None or cached['data'] is not market_data:
+            st.session_state.market_data_cache = {
+                'symbols': tuple(symbols),
+                'data': market_data,
+                'updated': datetime.now()
+            }
+            
         return market_data
     except Exception as e:
         st.error(f"Error loading market data: {str(e)}")
         return None
 
+@st.cache_resource
+def garch_worker_pool() -> ProcessPoolExecutor:
+    """Spawned worker processes for the batch GARCH fits, kept across reruns and sessions"""
+    return garch_pool()
+
 def create_analyzers(market_data: Dict, symbols: List[str]) -> Dict:
     """Initialize analysis components"""
     analyzers = {}
     
     try:
+        # Fit GARCH for all symbols in parallel; fits of unchanged data
+        # come from the model cache
+        model_cache = ModelCache(Config.MODEL_CACHE_DIR, Config.MODEL_CACHE_MAX_BYTES)
+        returns_panel = pd.DataFrame({symbol: market_data[symbol]['Returns'] for symbol in symbols})
+        try:
+            garch_batch = fit_garch_batch(returns_panel, cache=model_cache, pool=garch_worker_pool())
+        except BrokenProcessPool:
+            # A worker died on an earlier run; start a fresh pool
+            garch_worker_pool.clear()
+            garch_batch = fit_garch_batch(returns_panel, cache=model_cache, pool=garch_worker_pool())
+        
         for symbol in symbols:
-            returns = market_data[symbol]['Returns']
+            if symbol not in garch_batch.volatility:
+                st.warning(f"GARCH fit failed for {symbol}: {garch_batch.table.loc[symbol, 'error']}")
+                continue
+            if not garch_batch.table.loc[symbol, 'converged']:
+                st.warning(f"GARCH fit for {symbol} did not converge; its volatility estimates may be unreliable")
+                
+            returns = market_data[symbol]['Returns'].dropna()
             
-            # Initialize GARCH model
-            garch_model = GarchModel(returns)
-            garch_results = garch_model.fit()
+            # Rebuild the GARCH model from the batch parameters
+            garch_model = garch_batch.fitted_model(symbol, returns, cache=model_cache)
+            garch_volatility = garch_batch.volatility[symbol]
             
             # Initialize volatility analyzer with GARCH results
-            vol_analyzer = VolatilityAnalyzer(returns)
-            vol_analyzer.volatility = garch_results.volatility
+            vol_analyzer = VolatilityAnalyzer(returns, cache=model_cache)
+            vol_analyzer.volatility = garch_volatility
             
             # Initialize clustering analysis
-            clustering = VolatilityClustering(returns, garch_results.volatility)
+            clustering = VolatilityClustering(returns, garch_volatility)
             clusters = clustering.identify_clusters()
             
             # Initialize regime detection
-            regime_detector = RegimeDetector(garch_results.volatility)
+            regime_detector = RegimeDetector(garch_volatility)
             regimes, regime_stats = regime_detector.detect_regimes()
             
             # Initialize risk analyzer
-            risk_analyzer = RiskAnalyzer(returns, garch_results.volatility)
+            risk_analyzer = RiskAnalyzer(returns, garch_volatility)
             
             analyzers[symbol] = {
                 'volatility': vol_analyzer,
@@ -177,7 +222,8 @@ def main():
     # Initialize portfolio manager and optimizer
     portfolio_manager = PortfolioRiskManager(config['portfolio_value'])
     portfolio_optimizer = PortfolioOptimizer(
-        pd.DataFrame({symbol: market_data[symbol]['Returns'] for symbol in config['symbols']})
+        pd.DataFrame({symbol: market_data[symbol]['Returns'] for symbol in config['symbols']}),
+        estimator=Config.COVARIANCE_ESTIMATOR
     )
     
     # Initialize plotting
@@ -0,0 +1,112 @@
+# models/cache.py
+
+import os
+import json
+import pickle
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+import arch
+from typing import Dict, Optional
+
+class ModelCache:
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 ** 2):
+        """
+        On-disk cache of fitted volatility models
+
+        Parameters:
+        -----------
+        directory : str
+            Root directory of the cache. Created on first write.
+        max_bytes : int
+            Size cap of the cache; least recently used entries are evicted
+            once it is exceeded
+
+        An entry holds whatever a fit produced (parameters, arch's rescaling
+        factor, conditional volatility, fit statistics, diagnostics) and is
+        keyed by the returns it was fitted on, the model specification and
+        the arch version, so any change in the inputs is a cache miss.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(returns: pd.Series, **spec) -> str:
+        """Fingerprint of a returns series, model specification and arch version"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(returns.to_numpy(dtype=np.float64)).tobytes())
+        if isinstance(returns.index, pd.DatetimeIndex):
+            digest.update(returns.index.asi8.tobytes())
+        digest.update(json.dumps(spec, sort_keys=True, default=str).encode())
+        digest.update(arch.__version__.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached entry for a key, or None; a hit marks the entry as recently used"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: discarding unreadable model cache entry {key}: {str(e)}")
+            self._remove(path)
+            return None
+        return entry
+
+    def put(self, key: str, entry: Dict):
+        """Store an entry, replacing any previous one, and enforce the size cap"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def update(self, key: str, **fields):
+        """Add fields (e.g. diagnostics) to an entry"""
+        entry = self.get(key) or {}
+        entry.update(fields)
+        self.put(key, entry)
+
+    def clear(self):
+        """Remove every entry"""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                self._remove(os.path.join(self.directory, name))
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits ``max_bytes``"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.pkl'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(os.path.join(self.directory, name))
+                total -= size
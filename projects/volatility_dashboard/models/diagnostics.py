@@ -0,0 +1,242 @@
+# models/diagnostics.py
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+DEFAULT_LB_LAGS = (10,)
+DEFAULT_ARCH_LAGS = 10
+
+def _pack(residuals: Union[pd.DataFrame, Mapping[str, pd.Series]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Top-aligned, zero-padded (max length x columns) matrix of the valid values of every column"""
+    if isinstance(residuals, pd.DataFrame):
+        residuals = {column: residuals[column] for column in residuals.columns}
+    names = list(residuals)
+    columns = [np.asarray(pd.Series(residuals[name]).dropna(), dtype=np.float64) for name in names]
+    lengths = np.array([len(column) for column in columns])
+
+    values = np.zeros((max(lengths.max(initial=0), 1), len(names)))
+    for j, column in enumerate(columns):
+        values[:len(column), j] = column
+    return names, values, lengths
+
+def _valid_rows(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    return np.arange(values.shape[0])[:, None] < lengths[None, :]
+
+def ljung_box(values: np.ndarray, lengths: np.ndarray, lags: Sequence[int] = DEFAULT_LB_LAGS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ljung-Box statistics of every column for several lags at once
+
+    The autocorrelations up to the largest lag come from a single FFT of
+    the demeaned, zero-padded panel (the padding contributes nothing to the
+    sums), so the cost does not grow with the number of lags.
+
+    Returns:
+    --------
+    Tuple[np.ndarray, np.ndarray]
+        Statistics and p-values, shape (len(lags), columns)
+    """
+    lags = np.asarray(lags)
+    max_lag = int(lags.max())
+    valid = _valid_rows(values, lengths)
+    n = lengths.astype(np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x = np.where(valid, values - values.sum(axis=0) / n, 0.0)
+        size = 1 << int(np.ceil(np.log2(2 * values.shape[0])))
+        spectrum = np.fft.rfft(x, n=size, axis=0)
+        autocov = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=0)[:max_lag + 1]
+        acf = autocov[1:] / autocov[0]
+
+        k = np.arange(1, max_lag + 1)[:, None]
+        terms = acf ** 2 / (n[None, :] - k)
+        statistic = (n * (n + 2))[None, :] * np.cumsum(terms, axis=0)[lags - 1]
+    return statistic, stats.chi2.sf(statistic, lags[:, None])
+
+def arch_lm(values: np.ndarray, lengths: np.ndarray, nlags: int = DEFAULT_ARCH_LAGS) -> Dict[str, np.ndarray]:
+    """
+    Engle's ARCH-LM test of every column, as ``statsmodels.het_arch``
+
+    Squared values are regressed on a constant and ``nlags`` of their own
+    lags. The normal equations of all columns are accumulated from shifted
+    views of one padded panel and solved as a single batched system.
+
+    Returns:
+    --------
+    Dict[str, np.ndarray]
+        'lm_stat', 'lm_pvalue', 'f_stat', 'f_pvalue' per column
+    """
+    rows, count = values.shape
+    squared = np.where(_valid_rows(values, lengths), values ** 2, 0.0)
+    padded = np.vstack([np.zeros((nlags, count)), squared])
+    regressors = [np.ones((rows, count))] + [padded[nlags - lag:nlags - lag + rows] for lag in range(1, nlags + 1)]
+
+    # Rows with a full set of lags inside the series
+    t = np.arange(rows)[:, None]
+    weights = ((t >= nlags) & (t < lengths[None, :])).astype(np.float64)
+    nobs = weights.sum(axis=0)
+
+    xtx = np.empty((count, nlags + 1, nlags + 1))
+    xty = np.empty((count, nlags + 1))
+    for a in range(nlags + 1):
+        weighted = weights * regressors[a]
+        xty[:, a] = np.einsum('tj,tj->j', weighted, squared)
+        for b in range(a, nlags + 1):
+            xtx[:, a, b] = xtx[:, b, a] = np.einsum('tj,tj->j', weighted, regressors[b])
+
+    result = {name: np.full(count, np.nan) for name in ('lm_stat', 'lm_pvalue', 'f_stat', 'f_pvalue')}
+    usable = nobs > 2 * nlags + 1
+    if not usable.any():
+        return result
+
+    beta = np.linalg.solve(xtx[usable], xty[usable][..., None])[..., 0]
+    yy = np.einsum('tj,tj->j', weights * squared, squared)[usable]
+    mean = xty[usable, 0] / nobs[usable]
+    ssr = yy - (beta * xty[usable]).sum(axis=1)
+    tss = yy - nobs[usable] * mean ** 2
+    r_squared = 1 - ssr / tss
+
+    df_resid = nobs[usable] - nlags - 1
+    result['lm_stat'][usable] = nobs[usable] * r_squared
+    result['lm_pvalue'][usable] = stats.chi2.sf(result['lm_stat'][usable], nlags)
+    result['f_stat'][usable] = (r_squared / nlags) / ((1 - r_squared) / df_resid)
+    result['f_pvalue'][usable] = stats.f.sf(result['f_stat'][usable], nlags, df_resid)
+    return result
+
+def jarque_bera(values: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Jarque-Bera statistics and p-values of every column, as ``scipy.stats.jarque_bera``"""
+    valid = _valid_rows(values, lengths)
+    n = lengths.astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x = np.where(valid, values - values.sum(axis=0) / n, 0.0)
+        x2 = x * x
+        m2 = x2.sum(axis=0) / n
+        skew = np.einsum('tj,tj->j', x2, x) / n / m2 ** 1.5
+        kurtosis = np.einsum('tj,tj->j', x2, x2) / n / m2 ** 2
+        statistic = n / 6 * (skew ** 2 + (kurtosis - 3) ** 2 / 4)
+    return statistic, stats.chi2.sf(statistic, 2)
+
+def batch_diagnostics(residuals: Union[pd.DataFrame, Mapping[str, pd.Series]],
+                      tests: Optional[Sequence[str]] = None,
+                      lags: Sequence[int] = DEFAULT_LB_LAGS,
+                      arch_lags: int = DEFAULT_ARCH_LAGS) -> Dict[str, pd.DataFrame]:
+    """
+    Run diagnostic tests on the standardized residuals of many models
+
+    Parameters:
+    -----------
+    residuals : pd.DataFrame or Mapping[str, pd.Series]
+        Standardized residuals per symbol; NaN values are dropped, so
+        series of different lengths can share a frame
+    tests : Sequence[str], optional
+        Any of 'ljung_box', 'arch_test', 'jarque_bera' (default: all)
+    lags : Sequence[int]
+        Ljung-Box lags
+    arch_lags : int
+        Lags of the ARCH-LM regression
+
+    Returns:
+    --------
+    Dict[str, pd.DataFrame]
+        One frame per test indexed by symbol; Ljung-Box is indexed by
+        (symbol, lag)
+    """
+    tests = list(tests or ('ljung_box', 'arch_test', 'jarque_bera'))
+    unknown = set(tests) - {'ljung_box', 'arch_test', 'jarque_bera'}
+    if unknown:
+        raise ValueError(f"Unknown diagnostic tests: {sorted(unknown)}")
+
+    names, values, lengths = _pack(residuals)
+    output = {}
+    if 'ljung_box' in tests:
+        statistic, pvalue = ljung_box(values, lengths, lags)
+        index = pd.MultiIndex.from_product([names, list(lags)], names=['symbol', 'lag'])
+        output['ljung_box'] = pd.DataFrame(
+            {'lb_stat': statistic.T.ravel(), 'lb_pvalue': pvalue.T.ravel()}, index=index
+        )
+    if 'arch_test' in tests:
+        output['arch_test'] = pd.DataFrame(
+            arch_lm(values, lengths, arch_lags), index=pd.Index(names, name='symbol')
+        )
+    if 'jarque_bera' in tests:
+        statistic, pvalue = jarque_bera(values, lengths)
+        output['jarque_bera'] = pd.DataFrame(
+            {'jb_stat': statistic, 'jb_pvalue': pvalue}, index=pd.Index(names, name='symbol')
+        )
+    return output
+
+# Tests available on a single fitted model, by name
+DIAGNOSTICS: Dict[str, Callable[['ModelDiagnostics'], object]] = {}
+
+def register(name: str):
+    """Add a test to the registry of ``ModelDiagnostics``"""
+    def decorator(func):
+        DIAGNOSTICS[name] = func
+        return func
+    return decorator
+
+class ModelDiagnostics(Mapping):
+    def __init__(self, results, std_resid: np.ndarray):
+        """
+        Lazily evaluated diagnostics of one fitted model
+
+        Parameters:
+        -----------
+        results : ARCHModelResult
+            Fitted arch results
+        std_resid : np.ndarray
+            Standardized residuals
+
+        Tests run on first access and are memoized; ``diagnostics['ljung_box']``
+        only ever computes the Ljung-Box test.
+        """
+        self.results = results
+        self.values = np.asarray(std_resid, dtype=np.float64)[:, None]
+        self.lengths = np.array([len(self.values)])
+        self._memo: Dict[str, object] = {}
+
+    def __getitem__(self, name: str):
+        if name not in self._memo:
+            if name not in DIAGNOSTICS:
+                raise KeyError(f"Unknown diagnostic test: {name}")
+            self._memo[name] = DIAGNOSTICS[name](self)
+        return self._memo[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(DIAGNOSTICS)
+
+    def __len__(self) -> int:
+        return len(DIAGNOSTICS)
+
+    @property
+    def computed(self) -> Dict[str, object]:
+        """Results evaluated so far"""
+        return dict(self._memo)
+
+    def preload(self, results: Dict[str, object]):
+        """Seed the memo with results computed earlier (e.g. from a cache)"""
+        self._memo.update({name: value for name, value in results.items() if name in DIAGNOSTICS})
+
+@register('ljung_box')
+def _ljung_box(diagnostics: ModelDiagnostics) -> pd.DataFrame:
+    statistic, pvalue = ljung_box(diagnostics.values, diagnostics.lengths, DEFAULT_LB_LAGS)
+    return pd.DataFrame({'lb_stat': statistic[:, 0], 'lb_pvalue': pvalue[:, 0]}, index=list(DEFAULT_LB_LAGS))
+
+@register('arch_test')
+def _arch_test(diagnostics: ModelDiagnostics) -> Tuple[float, float, float, float]:
+    result = arch_lm(diagnostics.values, diagnostics.lengths, min(DEFAULT_ARCH_LAGS, len(diagnostics.values) // 5))
+    return tuple(float(result[name][0]) for name in ('lm_stat', 'lm_pvalue', 'f_stat', 'f_pvalue'))
+
+@register('jarque_bera')
+def _jarque_bera(diagnostics: ModelDiagnostics) -> Tuple[float, float]:
+    statistic, pvalue = jarque_bera(diagnostics.values, diagnostics.lengths)
+    return float(statistic[0]), float(pvalue[0])
+
+@register('aic')
+def _aic(diagnostics: ModelDiagnostics) -> float:
+    return diagnostics.results.aic
+
+@register('bic')
+def _bic(diagnostics: ModelDiagnostics) -> float:
+    return diagnostics.results.bic
@@ -1,12 +1,17 @@
 # models/garch.py
 
+import time
 import numpy as np
 import pandas as pd
 from arch import arch_model
 from scipy.stats import norm
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Sequence, Tuple, Optional
 from dataclasses import dataclass
 
+from models.cache import ModelCache
+from models.diagnostics import ModelDiagnostics
+from models.garch_simulation import DEFAULT_CHECKPOINTS, GarchSimulator, SimulationSummary
+
 @dataclass
 class GarchResults:
     volatility: pd.Series
@@ -15,13 +20,28 @@ class GarchResults:
     model_fit: any
     forecasts: Optional[pd.DataFrame] = None
 
+@dataclass
+class RollingGarchResults:
+    params: pd.DataFrame            # Parameter estimates per refit, indexed by last in-sample date
+    forecasts: pd.Series            # One-step-ahead volatility forecast made at each refit date
+    fit_time: float                 # Seconds spent in the optimizer
+    cold_fit_time: Optional[float] = None  # Same refits from default starting values
+    
+    @property
+    def speedup(self) -> Optional[float]:
+        """Cold over warm-started optimizer time"""
+        if self.cold_fit_time is None:
+            return None
+        return self.cold_fit_time / self.fit_time
+
 class GarchModel:
     def __init__(self, 
                  returns: pd.Series,
                  p: int = 1,
                  q: int = 1,
                  dist: str = 'normal',
-                 vol: str = 'Garch'):
+                 vol: str = 'Garch',
+                 cache: Optional[ModelCache] = None):
         """
         Initialize GARCH model
         
@@ -37,6 +57,9 @@ class GarchModel:
             Error distribution ('normal', 'studentst', 'skewt')
         vol : str
             Volatility model type ('Garch', 'EGARCH', 'GJR-GARCH')
+        cache : ModelCache, optional
+            Persistent cache of fits and diagnostics; a fit on returns
+            seen before reuses the stored parameters instead of optimizing
         """
         self.returns = returns
         self.p = p
@@ -45,6 +68,13 @@ class GarchModel:
         self.vol = vol
         self.model = None
         self.results = None
+        self.scale = 1.0
+        self.cache = cache
+        self._diagnostics = None
+        
+    def cache_key(self) -> str:
+        """Cache key of the returns and model specification"""
+        return ModelCache.key(self.returns, p=self.p, q=self.q, dist=self.dist, vol=self.vol)
         
     def fit(self, update_freq: Optional[int] = None) -> GarchResults:
         """
@@ -60,6 +90,11 @@ class GarchModel:
         GarchResults
             Fitted model results
         """
+        if self.cache is not None:
+            entry = self.cache.get(self.cache_key())
+            if entry is not None and 'params' in entry:
+                return self.fix(entry['params'], scale=entry['scale'])
+        
         # Scale returns for numerical stability
         scaled_returns = self.returns * 100
         
@@ -76,13 +111,62 @@ class GarchModel:
         # Fit model
         self.results = self.model.fit(
             disp='off',
-            update_freq=update_freq,
+            update_freq=update_freq or 0,
             show_warning=False
         )
+        self.scale = self.results.scale
+        
+        results = self._package_results()
+        if self.cache is not None and getattr(self.results, 'convergence_flag', 0) == 0:
+            self.cache.put(self.cache_key(), self.fit_summary(results))
+        return results
+    
+    def fit_summary(self, results: GarchResults) -> Dict:
+        """Parameters, fit statistics and conditional volatility of a fit"""
+        return {
+            'params': results.params,
+            'scale': self.scale,
+            'loglikelihood': self.results.loglikelihood,
+            'aic': self.results.aic,
+            'bic': self.results.bic,
+            'converged': getattr(self.results, 'convergence_flag', 0) == 0,
+            'volatility': results.volatility.to_numpy()
+        }
+    
+    def fix(self, params: Dict[str, float], scale: float = 1.0) -> GarchResults:
+        """
+        Rebuild results from known parameters without running the optimizer
         
+        Parameters:
+        -----------
+        params : Dict[str, float]
+            Parameters of an earlier fit (``GarchResults.params``)
+        scale : float
+            arch's rescaling factor of that fit (``results.scale``)
+            
+        Returns:
+        --------
+        GarchResults
+            Results with the conditional volatility implied by ``params``
+        """
+        self.model = arch_model(
+            self.returns * 100 * scale,
+            p=self.p,
+            q=self.q,
+            dist=self.dist,
+            vol=self.vol,
+            rescale=False
+        )
+        self.results = self.model.fix(np.array(list(params.values())))
+        self.scale = scale
+        
+        return self._package_results()
+    
+    def _package_results(self) -> GarchResults:
+        """Convert the arch result back to the original return scale"""
         # Scale volatility back to original scale
         volatility = pd.Series(
-            self.results.conditional_volatility / 100,
+            self.results.conditional_volatility / (100 * self.scale),
             index=self.returns.index
         )
         
@@ -102,6 +186,98 @@ class GarchModel:
             model_fit=self.results
         )
     
+    def rolling_fit(self,
+                    start: int = 252,
+                    window: Optional[int] = None,
+                    step: int = 1,
+                    warm_start: bool = True,
+                    compare_cold: bool = False) -> RollingGarchResults:
+        """
+        Walk-forward refits on an expanding or rolling window
+        
+        Parameters:
+        -----------
+        start : int
+            Number of observations in the first fit
+        window : int, optional
+            Rolling window length (default: expanding window)
+        step : int
+            Observations between refits (1 = daily)
+        warm_start : bool
+            Seed every fit with the previous fit's parameters and, for
+            expanding windows, reuse its variance backcast
+        compare_cold : bool
+            Also run every refit from default starting values and record
+            the time in ``cold_fit_time``
+            
+        Returns:
+        --------
+        RollingGarchResults
+            Parameter path and one-step volatility forecasts
+            
+        All refits share one model on the full sample and only move
+        ``first_obs``/``last_obs``. Returns are scaled by 100 without
+        arch's automatic rescaling so parameters stay comparable between
+        refits, which is what makes them usable as starting values.
+        """
+        scaled_returns = self.returns * 100
+        model = arch_model(
+            scaled_returns,
+            p=self.p,
+            q=self.q,
+            dist=self.dist,
+            vol=self.vol,
+            rescale=False
+        )
+        
+        ends = range(start, len(scaled_returns) + 1, step)
+        
+        def refit(seeded: bool):
+            params, forecasts = [], []
+            previous, backcast = None, None
+            elapsed = 0.0
+            for end in ends:
+                first_obs = end - window if window else None
+                
+                fit_start = time.perf_counter()
+                result = model.fit(
+                    disp='off',
+                    show_warning=False,
+                    first_obs=first_obs,
+                    last_obs=end,
+                    starting_values=previous if seeded else None,
+                    backcast=backcast if seeded else None
+                )
+                elapsed += time.perf_counter() - fit_start
+                
+                if seeded:
+                    previous = result.params
+                    if window is None and backcast is None:
+                        # The backcast only depends on the start of the sample
+                        resid = np.asarray(result.resid)[first_obs or 0:end]
+                        backcast = model.volatility.backcast(resid)
+                        
+                variance = result.forecast(
+                    horizon=1,
+                    start=scaled_returns.index[end - 1],
+                    reindex=False
+                ).variance.iloc[0, 0]
+                
+                params.append(result.params)
+                forecasts.append(np.sqrt(variance) / 100)
+            return params, forecasts, elapsed
+        
+        params, forecasts, fit_time = refit(warm_start)
+        cold_fit_time = refit(False)[2] if compare_cold else None
+        
+        dates = scaled_returns.index[[end - 1 for end in ends]]
+        return RollingGarchResults(
+            params=pd.DataFrame(params, index=dates),
+            forecasts=pd.Series(forecasts, index=dates, name='forecast_volatility'),
+            fit_time=fit_time,
+            cold_fit_time=cold_fit_time
+        )
+    
     def forecast(self, 
                 horizon: int = 5, 
                 reindex: bool = True) -> pd.DataFrame:
@@ -152,9 +328,87 @@ class GarchModel:
         
         return forecast_df
     
+    def forecast_surface(self, horizons: Sequence[int] = (1, 5, 10, 21, 63, 126, 252)) -> np.ndarray:
+        """
+        Volatility term structure forecast from every date at once
+        
+        Parameters:
+        -----------
+        horizons : Sequence[int]
+            Forecast horizons in days (1 = next day)
+            
+        Returns:
+        --------
+        np.ndarray
+            Daily volatility expected ``h`` days after each date, in return
+            units, shape (len(horizons), len(returns)); row ``i`` is horizon
+            ``horizons[i]`` and column ``t`` the forecast made at
+            ``returns.index[t]``. Feeds ``plot_volatility_surface`` with
+            ``dates=returns.index`` directly.
+            
+        For GARCH(1,1) and GJR-GARCH(1,1,1) the h-step variance has the
+        closed form
+        
+            sigma2[t+h] = omega * (1 - phi^(h-1)) / (1 - phi) + phi^(h-1) * sigma2[t+1]
+            
+        with persistence phi = alpha + beta + gamma / 2 (symmetric shocks,
+        as arch's analytic forecasts), so the whole surface is one outer
+        product instead of one ``forecast`` call per origin date.
+        """
+        if self.results is None:
+            raise ValueError("Model must be fit before forecasting")
+        
+        params = self.results.params
+        if self.vol.upper() == 'EGARCH':
+            raise ValueError("Closed-form forecasts are only available for GARCH and GJR-GARCH")
+        if any(name.endswith('[2]') for name in params.index):
+            raise ValueError("Closed-form forecasts are only available for first-order models")
+            
+        omega = params['omega']
+        alpha = params.get('alpha[1]', 0.0)
+        gamma = params.get('gamma[1]', 0.0)
+        beta = params.get('beta[1]', 0.0)
+        phi = alpha + beta + gamma / 2
+        
+        # One step ahead from every origin
+        resid = np.asarray(self.results.resid)
+        variance = np.asarray(self.results.conditional_volatility) ** 2
+        next_variance = omega + (alpha + gamma * (resid < 0)) * resid ** 2 + beta * variance
+        
+        steps = np.asarray(horizons, dtype=np.float64)[:, None] - 1
+        decay = phi ** steps
+        if np.isclose(phi, 1.0):
+            level = omega * steps
+        else:
+            level = omega * (1 - decay) / (1 - phi)
+        surface = level + decay * next_variance[None, :]
+        
+        return np.sqrt(surface) / (100 * self.scale)
+    
+    def _simulator(self, seed: Optional[int] = None) -> Tuple[GarchSimulator, float]:
+        """Simulator for the fitted model and the variance of the first simulated day"""
+        if self.results is None:
+            raise ValueError("Model must be fit before simulation")
+            
+        simulator = GarchSimulator(
+            self.results.params.to_dict(),
+            vol=self.vol,
+            dist=self.dist,
+            scale=100 * self.scale,
+            seed=seed
+        )
+        
+        # Variance recursion one step past the last observation
+        last_resid = np.asarray(self.results.resid)[-1]
+        last_variance = np.asarray(self.results.conditional_volatility)[-1] ** 2
+        initial_variance = float(simulator.next_variance(last_resid, last_variance))
+        return simulator, initial_variance
+    
     def simulate_paths(self, 
                       horizon: int = 21, 
-                      num_paths: int = 1000) -> np.ndarray:
+                      num_paths: int = 1000,
+                      chunk_size: int = 10_000,
+                      seed: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Simulate future return paths using fitted GARCH model
         
@@ -164,74 +418,91 @@ class GarchModel:
             Number of days to simulate
         num_paths : int
             Number of simulation paths
+        chunk_size : int
+            Paths simulated at a time
+        seed : int, optional
+            Random seed
             
         Returns:
         --------
-        np.ndarray
-            Simulated return paths
+        Tuple[np.ndarray, np.ndarray]
+            Simulated return and volatility paths (horizon x num_paths),
+            in return units
         """
-        if self.results is None:
-            raise ValueError("Model must be fit before simulation")
-            
-        # Get last volatility estimate
-        last_vol = self.results.conditional_volatility[-1]
-        
-        # Get GARCH parameters
-        omega = self.results.params['omega']
-        alpha = self.results.params[f'alpha[1]']
-        beta = self.results.params[f'beta[1]']
-        
-        # Initialize arrays
-        returns = np.zeros((horizon, num_paths))
-        volatility = np.zeros((horizon, num_paths))
-        volatility[0] = last_vol
-        
-        # Simulate paths
-        for t in range(1, horizon):
-            # Generate random shocks
-            epsilon = np.random.standard_normal(num_paths)
-            
-            # Update volatility
-            volatility[t] = np.sqrt(omega + 
-                                  alpha * returns[t-1]**2 + 
-                                  beta * volatility[t-1]**2)
-            
-            # Generate returns
-            returns[t] = epsilon * volatility[t]
-        
+        simulator, initial_variance = self._simulator(seed)
+        _, returns, volatility = simulator.simulate(
+            initial_variance,
+            horizon,
+            num_paths,
+            chunk_size=chunk_size,
+            checkpoints=None,
+            store_paths=True
+        )
         return returns, volatility
-
-    def diagnostic_tests(self) -> Dict:
+    
+    def simulate_summary(self,
+                         horizon: int = 252,
+                         num_paths: int = 100_000,
+                         checkpoints: Optional[List[int]] = DEFAULT_CHECKPOINTS,
+                         chunk_size: int = 10_000,
+                         seed: Optional[int] = None) -> SimulationSummary:
         """
-        Perform diagnostic tests on fitted model
+        Simulate paths keeping only summaries, for large tail-risk runs
+        
+        Memory is bounded by ``chunk_size`` plus one value per path and
+        checkpoint horizon; the full path matrix is never materialized.
         
         Returns:
         --------
-        Dict
-            Dictionary of test results
+        SimulationSummary
+            Cumulative return distribution per checkpoint (and at the final
+            horizon) and per-day moments across paths, in return units
         """
+        simulator, initial_variance = self._simulator(seed)
+        summary, _, _ = simulator.simulate(
+            initial_variance,
+            horizon,
+            num_paths,
+            chunk_size=chunk_size,
+            checkpoints=checkpoints
+        )
+        return summary
+
+    @property
+    def diagnostics(self) -> ModelDiagnostics:
+        """Lazily evaluated, memoized diagnostics of the current fit"""
         if self.results is None:
             raise ValueError("Model must be fit before testing")
             
-        # Standardized residuals
-        std_resid = self.results.resid / self.results.conditional_volatility
+        if self._diagnostics is None or self._diagnostics.results is not self.results:
+            std_resid = np.asarray(self.results.resid / self.results.conditional_volatility)
+            self._diagnostics = ModelDiagnostics(self.results, std_resid)
+            if self.cache is not None:
+                entry = self.cache.get(self.cache_key())
+                if entry is not None:
+                    self._diagnostics.preload(entry.get('diagnostics', {}))
+        return self._diagnostics
+
+    def diagnostic_tests(self, tests: Optional[List[str]] = None) -> Dict:
+        """
+        Perform diagnostic tests on fitted model
         
-        # Ljung-Box test for autocorrelation
-        from statsmodels.stats.diagnostic import acorr_ljungbox
-        lb_test = acorr_ljungbox(std_resid, lags=[10], return_df=True)
+        Parameters:
+        -----------
+        tests : List[str], optional
+            Names of the tests to run (default: every registered test,
+            'ljung_box', 'arch_test', 'jarque_bera', 'aic', 'bic')
         
-        # Engle's test for ARCH effects
-        from statsmodels.stats.diagnostic import het_arch
-        arch_test = het_arch(std_resid)
+        Returns:
+        --------
+        Dict
+            Dictionary of test results
+        """
+        diagnostics = self.diagnostics
+        computed = set(diagnostics.computed)
         
-        # Jarque-Bera test for normality
-        from scipy.stats import jarque_bera
-        jb_test = jarque_bera(std_resid)
+        results = {name: diagnostics[name] for name in (tests or list(diagnostics))}
         
-        return {
-            'ljung_box': lb_test,
-            'arch_test': arch_test,
-            'jarque_bera': jb_test,
-            'aic': self.results.aic,
-            'bic': self.results.bic
-        }
\ No newline at end of file
+        if self.cache is not None and set(diagnostics.computed) != computed:
+            self.cache.update(self.cache_key(), diagnostics=diagnostics.computed)
+        return results
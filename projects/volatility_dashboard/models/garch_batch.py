@@ -0,0 +1,225 @@
+# models/garch_batch.py
+
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.cache import ModelCache
+from models.diagnostics import DEFAULT_LB_LAGS, batch_diagnostics
+from models.garch import GarchModel
+
+@dataclass
+class BatchGarchResults:
+    table: pd.DataFrame               # One row per symbol: parameters and diagnostics
+    volatility: Dict[str, pd.Series]  # Conditional volatility of every fitted symbol
+
+    def fitted_model(self, symbol: str, returns: pd.Series, cache: Optional[ModelCache] = None) -> GarchModel:
+        """GarchModel for a symbol with results rebuilt from the batch parameters"""
+        row = self.table.loc[symbol]
+        model = GarchModel(returns.dropna(), p=int(row['p']), q=int(row['q']),
+                           dist=row['dist'], vol=row['vol'], cache=cache)
+        params = {name: row[name] for name in row['param_names']}
+        model.fix(params, scale=row['scale'])
+        return model
+
+    def variance_params(self) -> pd.DataFrame:
+        """Variance recursion parameters of every fitted symbol, omega in squared return units"""
+        fitted = self.table.loc[list(self.volatility)]
+        columns = [name for name in ('omega', 'alpha[1]', 'gamma[1]', 'beta[1]') if name in fitted]
+        params = fitted[columns].astype(np.float64)
+        params['omega'] = params['omega'] / (100 * fitted['scale']) ** 2
+        return params
+
+    def standardized_residuals(self, returns: pd.DataFrame) -> pd.DataFrame:
+        """Standardized residuals of every fitted symbol, from the returns the batch was fitted on"""
+        residuals = {}
+        for symbol, volatility in self.volatility.items():
+            row = self.table.loc[symbol]
+            mean = row['mu'] / (100 * row['scale']) if 'mu' in row else 0.0
+            residuals[symbol] = (returns[symbol].reindex(volatility.index) - mean) / volatility
+        return pd.DataFrame(residuals)
+
+    def next_volatility(self, returns: pd.DataFrame) -> pd.Series:
+        """
+        One-step-ahead volatility sigma[T+1] of every fitted symbol, in return units
+        
+        The variance recursion applied to the last residual and variance of
+        the returns the batch was fitted on, e.g. as ``current_vol`` of
+        ``filtered_historical_simulation``.
+        """
+        params = self.variance_params()
+        residuals = self.standardized_residuals(returns)
+        forecasts = {}
+        for symbol, volatility in self.volatility.items():
+            row = params.loc[symbol]
+            last = residuals[symbol].last_valid_index()
+            resid = residuals.at[last, symbol] * volatility[last]
+            gamma = row['gamma[1]'] if 'gamma[1]' in row else 0.0
+            forecasts[symbol] = np.sqrt(row['omega'] + (row['alpha[1]'] + gamma * (resid < 0)) * resid ** 2
+                                        + row['beta[1]'] * volatility[last] ** 2)
+        return pd.Series(forecasts)
+
+    def diagnostics(self,
+                    returns: pd.DataFrame,
+                    tests: Optional[Sequence[str]] = None,
+                    lags: Sequence[int] = DEFAULT_LB_LAGS) -> Dict[str, pd.DataFrame]:
+        """Selected diagnostic tests for all fitted symbols at once (see ``batch_diagnostics``)"""
+        return batch_diagnostics(self.standardized_residuals(returns), tests=tests, lags=lags)
+
+# Returns panel shared with the worker processes
+def garch_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Process pool for ``fit_garch_batch``, to be kept and reused
+
+    Workers are spawned rather than forked: forking a threaded process
+    (Streamlit serves each session on its own thread) can copy locks
+    held by other threads and deadlock the child.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1,
+                               mp_context=multiprocessing.get_context('spawn'))
+
+def _fit_column(segment_name: str, shape: tuple, column: int, p: int, q: int, dist: str, vol: str) -> Dict:
+    """Fit one symbol's returns, read from the shared panel; failures are returned, not raised"""
+    # Workers share the parent's resource tracker, so the parent alone unlinks the segment
+    segment = shared_memory.SharedMemory(name=segment_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=segment.buf)[:, column].copy()
+    finally:
+        segment.close()
+        
+    valid = ~np.isnan(values)
+    try:
+        model = GarchModel(pd.Series(values[valid]), p=p, q=q, dist=dist, vol=vol)
+        outcome = model.fit_summary(model.fit())
+        outcome.update({'n_obs': int(valid.sum()), 'valid': valid, 'error': None})
+        return outcome
+    except Exception as e:
+        return {'converged': False, 'n_obs': int(valid.sum()), 'error': str(e)}
+
+def _fit_pending(values: np.ndarray,
+                 pending: List[Tuple[int, str]],
+                 p: int,
+                 q: int,
+                 dist: str,
+                 vol: str,
+                 max_workers: Optional[int],
+                 pool: Optional[ProcessPoolExecutor]) -> Dict[str, Dict]:
+    """Fit the given (column, symbol) pairs on a pool sharing the panel"""
+    owned = pool is None
+    if owned:
+        pool = garch_pool(min(max_workers or os.cpu_count() or 1, len(pending)))
+
+    segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=segment.buf)[:] = values
+
+        outcomes = {}
+        futures = {
+            pool.submit(_fit_column, segment.name, values.shape, j, p, q, dist, vol): symbol
+            for j, symbol in pending
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                outcomes[symbol] = future.result()
+            except Exception as e:
+                # e.g. a worker process died
+                outcomes[symbol] = {'converged': False, 'n_obs': 0, 'error': str(e)}
+    finally:
+        if owned:
+            pool.shutdown()
+        segment.close()
+        segment.unlink()
+    return outcomes
+
+def fit_garch_batch(returns: pd.DataFrame,
+                    p: int = 1,
+                    q: int = 1,
+                    dist: str = 'normal',
+                    vol: str = 'Garch',
+                    max_workers: Optional[int] = None,
+                    cache: Optional[ModelCache] = None,
+                    pool: Optional[ProcessPoolExecutor] = None) -> BatchGarchResults:
+    """
+    Fit a GARCH model to every symbol of a returns panel on a process pool
+
+    Parameters:
+    -----------
+    returns : pd.DataFrame
+        Returns, dates x symbols; NaN marks a missing observation
+    p, q, dist, vol :
+        Model specification, as for ``GarchModel``
+    max_workers : int, optional
+        Number of worker processes (default: one per CPU, at most one per
+        symbol); ignored when ``pool`` is given
+    cache : ModelCache, optional
+        Persistent cache of fits; symbols whose returns were fitted before
+        are taken from it and never reach the pool, and new converged fits
+        are stored
+    pool : ProcessPoolExecutor, optional
+        Long-lived pool from ``garch_pool``, so repeated batches do not pay
+        for starting workers (default: a spawned pool for this call only)
+
+    Returns:
+    --------
+    BatchGarchResults
+        Tidy parameter/diagnostics table indexed by symbol and conditional
+        volatilities. A symbol whose fit fails or does not converge keeps
+        its row, with ``converged`` False and the error message if any.
+
+    The panel is copied once into shared memory and each task maps it by
+    name, so only a column number is sent per task.
+    """
+    values = np.ascontiguousarray(returns.to_numpy(dtype=np.float64))
+    symbols = list(returns.columns)
+    
+    outcomes, keys = {}, {}
+    if cache is not None:
+        for j, symbol in enumerate(symbols):
+            keys[symbol] = ModelCache.key(returns[symbol].dropna(), p=p, q=q, dist=dist, vol=vol)
+            entry = cache.get(keys[symbol])
+            if entry is not None and 'params' in entry:
+                valid = ~np.isnan(values[:, j])
+                outcomes[symbol] = dict(entry, n_obs=int(valid.sum()), valid=valid, error=None)
+    pending = [(j, symbol) for j, symbol in enumerate(symbols) if symbol not in outcomes]
+    if pending:
+        outcomes.update(_fit_pending(values, pending, p, q, dist, vol, max_workers, pool))
+        
+    if cache is not None:
+        for _, symbol in pending:
+            outcome = outcomes[symbol]
+            # A fit that did not converge is not kept: the next batch tries it again
+            if outcome['error'] is None and outcome['converged']:
+                cache.put(keys[symbol], {name: value for name, value in outcome.items()
+                                         if name not in ('n_obs', 'valid', 'error')})
+
+    rows, volatility = [], {}
+    for symbol in symbols:
+        outcome = outcomes[symbol]
+        row = {'symbol': symbol, 'p': p, 'q': q, 'dist': dist, 'vol': vol}
+        row.update(outcome.get('params', {}))
+        row.update({
+            'param_names': list(outcome.get('params', {})),
+            'scale': outcome.get('scale', np.nan),
+            'loglikelihood': outcome.get('loglikelihood', np.nan),
+            'aic': outcome.get('aic', np.nan),
+            'bic': outcome.get('bic', np.nan),
+            'converged': outcome['converged'],
+            'n_obs': outcome['n_obs'],
+            'error': outcome['error']
+        })
+        rows.append(row)
+
+        if outcome['error'] is None:
+            volatility[symbol] = pd.Series(
+                outcome['volatility'],
+                index=returns.index[outcome['valid']],
+                name=symbol
+            )
+
+    return BatchGarchResults(table=pd.DataFrame(rows).set_index('symbol'), volatility=volatility)
@@ -0,0 +1,197 @@
+# models/garch_simulation.py
+
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+DEFAULT_CHECKPOINTS = (1, 5, 10, 21, 63, 126, 252)
+
+@dataclass
+class SimulationSummary:
+    horizons: np.ndarray            # Checkpoint horizons in days
+    cumulative_returns: np.ndarray  # Cumulative return per checkpoint and path
+    mean_returns: np.ndarray        # Mean daily return across paths, per day
+    std_returns: np.ndarray         # Std of daily returns across paths, per day
+    mean_volatility: np.ndarray     # Mean conditional volatility across paths, per day
+
+    @property
+    def terminal_returns(self) -> np.ndarray:
+        """Cumulative return distribution at the final horizon"""
+        return self.cumulative_returns[-1]
+
+    def quantiles(self, levels: Sequence[float] = (0.01, 0.05, 0.5, 0.95, 0.99)) -> pd.DataFrame:
+        """Quantiles of the cumulative return per checkpoint horizon"""
+        values = np.quantile(self.cumulative_returns, levels, axis=1).T
+        return pd.DataFrame(values, index=pd.Index(self.horizons, name='horizon'), columns=levels)
+
+class GarchSimulator:
+    def __init__(self,
+                 params: Dict[str, float],
+                 vol: str = 'Garch',
+                 dist: str = 'normal',
+                 scale: float = 1.0,
+                 seed: Optional[int] = None):
+        """
+        Path simulation for fitted GARCH(1,1), GJR-GARCH(1,1,1) and EGARCH(1,1)
+
+        Parameters:
+        -----------
+        params : Dict[str, float]
+            Fitted parameters using arch's names ('mu', 'omega', 'alpha[1]',
+            'gamma[1]', 'beta[1]', 'nu' or 'eta', 'lambda'). A 'gamma[1]' term with
+            vol='Garch' gives GJR-GARCH.
+        vol : str
+            Volatility recursion ('Garch', 'GJR-GARCH', 'EGARCH')
+        dist : str
+            Innovation distribution ('normal', 'studentst', 'skewt')
+        scale : float
+            Scale of the fitted data relative to returns (100 for returns
+            in percent); simulated returns and volatilities are divided by it
+        seed : int, optional
+            Seed of the random generator
+
+        Only the current variance of every path is carried from one day to
+        the next, in preallocated arrays, and paths are generated in chunks,
+        so memory is bounded by the chunk size unless full paths are asked
+        for.
+        """
+        self.vol = vol.upper().replace('-', '')
+        if self.vol not in ('GARCH', 'GJRGARCH', 'EGARCH'):
+            raise ValueError(f"Unsupported volatility model: {vol}")
+        if any(name.endswith('[2]') for name in params):
+            raise ValueError("Only first-order recursions are supported")
+        if dist not in ('normal', 'studentst', 'skewt'):
+            raise ValueError(f"Unsupported distribution: {dist}")
+
+        self.params = params
+        self.dist = dist
+        self.scale = scale
+        self.mu = params.get('mu', params.get('Const', 0.0))
+        self.omega = params['omega']
+        self.alpha = params.get('alpha[1]', 0.0)
+        self.gamma = params.get('gamma[1]', 0.0)
+        self.beta = params.get('beta[1]', 0.0)
+        self.rng = np.random.default_rng(seed)
+
+    def next_variance(self, resid: np.ndarray, variance: np.ndarray) -> np.ndarray:
+        """One step of the variance recursion given today's residual and variance"""
+        resid = np.asarray(resid, dtype=np.float64)
+        variance = np.asarray(variance, dtype=np.float64)
+        if self.vol == 'EGARCH':
+            z = resid / np.sqrt(variance)
+            log_variance = (self.omega
+                            + self.alpha * (np.abs(z) - np.sqrt(2 / np.pi))
+                            + self.gamma * z
+                            + self.beta * np.log(variance))
+            return np.exp(log_variance)
+        return (self.omega
+                + (self.alpha + self.gamma * (resid < 0)) * resid ** 2
+                + self.beta * variance)
+
+    def _innovations(self, size: int) -> np.ndarray:
+        """Standardized (zero mean, unit variance) shocks"""
+        if self.dist == 'normal':
+            return self.rng.standard_normal(size)
+        if self.dist == 'studentst':
+            nu = self.params['nu']
+            return self.rng.standard_t(nu, size) * np.sqrt((nu - 2) / nu)
+        # Hansen's skew-t: a unit-variance t magnitude, stretched by
+        # (1 - lambda) on the left and (1 + lambda) on the right, then
+        # standardized; the left side is drawn with probability (1 - lambda) / 2
+        eta, lam = self.params['eta'], self.params['lambda']
+        c = np.exp(gammaln((eta + 1) / 2) - gammaln(eta / 2)) / np.sqrt(np.pi * (eta - 2))
+        a = 4 * lam * c * (eta - 2) / (eta - 1)
+        b = np.sqrt(1 + 3 * lam ** 2 - a ** 2)
+        magnitude = np.abs(self.rng.standard_t(eta, size)) * np.sqrt((eta - 2) / eta)
+        left = self.rng.random(size) < (1 - lam) / 2
+        w = np.where(left, -(1 - lam) * magnitude, (1 + lam) * magnitude)
+        return (w - a) / b
+
+    def simulate(self,
+                 initial_variance: float,
+                 horizon: int,
+                 num_paths: int,
+                 chunk_size: int = 10_000,
+                 checkpoints: Optional[Sequence[int]] = DEFAULT_CHECKPOINTS,
+                 store_paths: bool = False) -> Tuple[SimulationSummary, Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        Simulate return paths
+
+        Parameters:
+        -----------
+        initial_variance : float
+            Conditional variance of the first simulated day
+        horizon : int
+            Number of days to simulate
+        num_paths : int
+            Number of paths
+        chunk_size : int
+            Paths simulated at a time
+        checkpoints : Sequence[int], optional
+            Horizons at which cumulative returns are kept for every path
+            (the final horizon is always kept)
+        store_paths : bool
+            Also return the full (horizon x num_paths) return and
+            volatility matrices
+
+        Returns:
+        --------
+        Tuple[SimulationSummary, np.ndarray, np.ndarray]
+            Summary, and the return and volatility paths (None unless
+            ``store_paths``)
+        """
+        horizons = sorted({h for h in (checkpoints or ()) if h <= horizon} | {horizon})
+        checkpoint_row = {h - 1: i for i, h in enumerate(horizons)}
+
+        cumulative = np.empty((len(horizons), num_paths))
+        sum_returns = np.zeros(horizon)
+        sum_squares = np.zeros(horizon)
+        sum_volatility = np.zeros(horizon)
+        returns_paths = np.empty((horizon, num_paths)) if store_paths else None
+        volatility_paths = np.empty((horizon, num_paths)) if store_paths else None
+
+        size = min(chunk_size, num_paths)
+        variance = np.empty(size)
+        volatility = np.empty(size)
+        resid = np.empty(size)
+        returns = np.empty(size)
+        total = np.empty(size)
+
+        for first in range(0, num_paths, size):
+            n = min(size, num_paths - first)
+            paths = slice(first, first + n)
+            variance[:n] = initial_variance
+            total[:n] = 0.0
+
+            for t in range(horizon):
+                np.sqrt(variance[:n], out=volatility[:n])
+                np.multiply(volatility[:n], self._innovations(n), out=resid[:n])
+                np.add(resid[:n], self.mu, out=returns[:n])
+                total[:n] += returns[:n]
+
+                sum_returns[t] += returns[:n].sum()
+                sum_squares[t] += np.dot(returns[:n], returns[:n])
+                sum_volatility[t] += volatility[:n].sum()
+                if t in checkpoint_row:
+                    cumulative[checkpoint_row[t], paths] = total[:n]
+                if store_paths:
+                    returns_paths[t, paths] = returns[:n]
+                    volatility_paths[t, paths] = volatility[:n]
+
+                variance[:n] = self.next_variance(resid[:n], variance[:n])
+
+        mean_returns = sum_returns / num_paths
+        std_returns = np.sqrt(np.maximum(sum_squares / num_paths - mean_returns ** 2, 0))
+        summary = SimulationSummary(
+            horizons=np.array(horizons),
+            cumulative_returns=cumulative / self.scale,
+            mean_returns=mean_returns / self.scale,
+            std_returns=std_returns / self.scale,
+            mean_volatility=sum_volatility / num_paths / self.scale
+        )
+        if store_paths:
+            returns_paths /= self.scale
+            volatility_paths /= self.scale
+        return summary, returns_paths, volatility_paths
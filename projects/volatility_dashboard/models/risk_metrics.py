@@ -4,9 +4,123 @@ import numpy as np
 import pandas as pd
 from arch import arch_model
 from scipy.stats import norm
-from typing import Dict, Tuple, Optional
+from typing import Dict, Tuple, Optional, Sequence, Union
 from dataclasses import dataclass
 
+@dataclass
+class FHSResult:
+    var: pd.DataFrame  # VaR (return quantile) per (horizon, confidence) x symbol
+    es: pd.DataFrame   # Expected shortfall (mean return beyond VaR), same layout
+    num_paths: int
+
+def filtered_historical_simulation(std_resid: pd.DataFrame,
+                                   current_vol: pd.Series,
+                                   confidence_levels: Sequence[float] = (0.95, 0.99),
+                                   horizons: Sequence[int] = (1, 5, 10),
+                                   num_paths: int = 10_000,
+                                   garch_params: Optional[pd.DataFrame] = None,
+                                   mean: Optional[pd.Series] = None,
+                                   batch_size: int = 2_000,
+                                   block_size: int = 256,
+                                   seed: Optional[int] = None) -> FHSResult:
+    """
+    Filtered historical simulation VaR/ES for a universe of symbols
+    
+    Parameters:
+    -----------
+    std_resid : pd.DataFrame
+        Standardized GARCH residuals, dates x symbols. Only dates where
+        every symbol has a residual are resampled.
+    current_vol : pd.Series
+        Conditional volatility of the first simulated day per symbol,
+        i.e. the one-step-ahead forecast sigma[T+1] (for a GARCH batch,
+        ``BatchGarchResults.next_volatility``)
+    confidence_levels : Sequence[float]
+        VaR/ES confidence levels
+    horizons : Sequence[int]
+        Horizons in days; returns are summed over the horizon
+    num_paths : int
+        Bootstrap paths
+    garch_params : pd.DataFrame, optional
+        'omega', 'alpha[1]', 'beta[1]' and optionally 'gamma[1]' per
+        symbol, with omega in squared return units. When given, volatility
+        follows the GARCH recursion along every path; otherwise it stays
+        at ``current_vol`` for the whole horizon.
+    mean : pd.Series, optional
+        Daily mean return per symbol (default: zero)
+    batch_size : int
+        Paths simulated at a time
+    block_size : int
+        Symbols simulated at a time. Peak memory is a few times
+        8 * len(horizons) * num_paths * block_size bytes, whatever the
+        size of the universe.
+    seed : int, optional
+        Seed of the random generator
+        
+    Returns:
+    --------
+    FHSResult
+        VaR and ES as returns, negative for losses like ``calculate_var``
+        
+    The bootstrap draws whole dates, shared by all symbols, so residuals
+    keep their cross-sectional dependence. The dates are drawn once and
+    replayed for every block of symbols; within a block, paths x symbols
+    are simulated as one array per day, never per symbol.
+    """
+    residuals = std_resid.dropna(how='any')
+    symbols = list(residuals.columns)
+    if residuals.empty:
+        raise ValueError("No dates with residuals for every symbol")
+        
+    z = residuals.to_numpy(dtype=np.float64)
+    vol = current_vol.reindex(symbols).to_numpy(dtype=np.float64)
+    mu = mean.reindex(symbols).fillna(0.0).to_numpy(dtype=np.float64) if mean is not None else np.zeros(len(symbols))
+    if garch_params is not None:
+        params = garch_params.reindex(symbols)
+        omega = params['omega'].to_numpy(dtype=np.float64)
+        alpha = params['alpha[1]'].to_numpy(dtype=np.float64)
+        beta = params['beta[1]'].to_numpy(dtype=np.float64)
+        gamma = params['gamma[1]'].fillna(0.0).to_numpy(dtype=np.float64) if 'gamma[1]' in params else np.zeros(len(symbols))
+        
+    horizons = sorted(set(horizons))
+    horizon_row = {h - 1: i for i, h in enumerate(horizons)}
+    rng = np.random.default_rng(seed)
+    dates = rng.integers(0, len(z), (horizons[-1], num_paths))
+    
+    levels = np.asarray(confidence_levels, dtype=np.float64)
+    var = np.empty((len(levels), len(horizons), len(symbols)))  # levels x horizons x symbols
+    es = np.empty_like(var)
+    for lo in range(0, len(symbols), block_size):
+        block = slice(lo, lo + block_size)
+        z_block = z[:, block]
+        width = z_block.shape[1]
+        totals = np.empty((len(horizons), num_paths, width))
+        
+        for first in range(0, num_paths, batch_size):
+            n = min(batch_size, num_paths - first)
+            variance = np.broadcast_to(vol[block] ** 2, (n, width)).copy()
+            total = np.zeros((n, width))
+            for t in range(horizons[-1]):
+                resid = np.sqrt(variance) * z_block[dates[t, first:first + n]]
+                total += mu[block] + resid
+                if t in horizon_row:
+                    totals[horizon_row[t], first:first + n] = total
+                if garch_params is not None:
+                    variance = (omega[block] + (alpha[block] + gamma[block] * (resid < 0)) * resid ** 2
+                                + beta[block] * variance)
+                    
+        var[:, :, block] = np.quantile(totals, 1 - levels, axis=1)
+        for i in range(len(levels)):
+            beyond = totals <= var[i, :, None, block]
+            es[i, :, block] = np.where(beyond, totals, 0.0).sum(axis=1) / np.maximum(beyond.sum(axis=1), 1)
+    
+    index = pd.MultiIndex.from_product([horizons, list(confidence_levels)], names=['horizon', 'confidence'])
+    return FHSResult(
+        var=pd.DataFrame(var.transpose(1, 0, 2).reshape(-1, len(symbols)), index=index, columns=symbols),
+        es=pd.DataFrame(es.transpose(1, 0, 2).reshape(-1, len(symbols)), index=index, columns=symbols),
+        num_paths=num_paths
+    )
+
 class RiskAnalyzer:
     def __init__(self, returns: pd.Series, volatility: pd.Series):
         self.returns = returns
@@ -21,9 +135,56 @@ class RiskAnalyzer:
         var = self.calculate_var(confidence)
         return -self.returns[self.returns < -var].mean()
         
+    def calculate_fhs_risk(self,
+                           confidence_levels: Sequence[float] = (0.95, 0.99),
+                           horizons: Sequence[int] = (1, 5, 10),
+                           num_paths: int = 10_000,
+                           garch_params: Optional[Dict[str, float]] = None,
+                           seed: Optional[int] = None) -> pd.DataFrame:
+        """
+        Filtered historical simulation VaR and ES
+        
+        Standardized residuals (returns over conditional volatility) are
+        rescaled and bootstrapped over each horizon. With ``garch_params``
+        (omega in squared return units) the first day's variance is the
+        one-step-ahead forecast from the last return and volatility, and
+        volatility evolves along every path; without them it stays at the
+        latest volatility.
+        
+        Returns:
+        --------
+        pd.DataFrame
+            'var' and 'es' per (horizon, confidence), as returns
+        """
+        mean = self.returns.mean()
+        std_resid = ((self.returns - mean) / self.volatility).dropna()
+        name = self.returns.name if self.returns.name is not None else 'returns'
+        
+        current_vol = self.volatility.iloc[-1]
+        if garch_params:
+            # sigma[T+1]^2 = omega + (alpha + gamma * 1[e_T < 0]) * e_T^2 + beta * sigma[T]^2
+            last = std_resid.index[-1]
+            resid = self.returns[last] - mean
+            variance = self.volatility[last] ** 2
+            current_vol = np.sqrt(
+                garch_params['omega']
+                + (garch_params['alpha[1]'] + garch_params.get('gamma[1]', 0.0) * (resid < 0)) * resid ** 2
+                + garch_params['beta[1]'] * variance
+            )
+        
+        result = filtered_historical_simulation(
+            std_resid.to_frame(name),
+            pd.Series({name: current_vol}),
+            confidence_levels=confidence_levels,
+            horizons=horizons,
+            num_paths=num_paths,
+            garch_params=pd.DataFrame([garch_params], index=[name]) if garch_params else None,
+            mean=pd.Series({name: mean}),
+            seed=seed
+        )
+        return pd.DataFrame({'var': result.var[name], 'es': result.es[name]})
+        
     def stress_test(self, scenarios: Dict[str, float]) -> pd.Series:
         """Perform stress testing under different scenarios"""
-        results = {}
-        for scenario, shock in scenarios.items():
-            results[scenario] = self.returns.mean() + shock * self.volatility.iloc[-1]
-        return pd.Series(results)
\ No newline at end of file
+        shocks = pd.Series(scenarios, dtype=np.float64)
+        return self.returns.mean() + shocks * self.volatility.iloc[-1]
\ No newline at end of file
@@ -0,0 +1,163 @@
+# models/stress.py
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple, Union
+
+# Historical stress episodes (start, end), replayed as cumulative returns
+HISTORICAL_EPISODES = {
+    'GFC 2008': ('2008-09-12', '2008-11-20'),
+    'Flash Crash 2010': ('2010-05-05', '2010-05-07'),
+    'US Downgrade 2011': ('2011-07-22', '2011-08-10'),
+    'Taper Tantrum 2013': ('2013-05-21', '2013-06-24'),
+    'Volmageddon 2018': ('2018-01-26', '2018-02-08'),
+    'Q4 2018 Selloff': ('2018-09-20', '2018-12-24'),
+    'COVID 2020': ('2020-02-19', '2020-03-23'),
+    'Rates Shock 2022': ('2022-01-03', '2022-10-12')
+}
+
+class StressEngine:
+    def __init__(self, returns: pd.DataFrame, vol_window: int = 63):
+        """
+        Scenario-matrix stress testing
+
+        Parameters:
+        -----------
+        returns : pd.DataFrame
+            Daily returns of the risk factors (symbols), dates x factors.
+            Used for historical replays, current volatilities and the
+            covariance that fills in unspecified shocks.
+        vol_window : int
+            Window of the current volatility estimate
+
+        A scenario set is a (scenarios x factors) matrix of factor returns;
+        P&L for a book of positions is one matrix product with the
+        exposures, so thousands of scenarios cost about as much as one.
+        """
+        self.returns = returns
+        self.factors = list(returns.columns)
+        self.current_vol = returns.iloc[-vol_window:].std()
+        self.covariance = returns.cov()
+        # Missing days (weekends for equities next to crypto, holidays) compound as flat,
+        # so a window's return is the product over the observations it has
+        self._growth = np.log1p(returns.fillna(0.0)).cumsum()
+        self._started = returns.notna().cummax()
+
+    def historical_scenarios(self, episodes: Optional[Dict[str, Tuple[str, str]]] = None) -> pd.DataFrame:
+        """
+        Cumulative factor returns over historical episodes
+
+        Each factor compounds the returns it has within the episode; it is
+        NaN only when it has no data at or before the episode start.
+        """
+        episodes = episodes or HISTORICAL_EPISODES
+        growth = self._growth
+        index = self.returns.index
+
+        scenarios = {}
+        for name, (start, end) in episodes.items():
+            first = index.searchsorted(pd.Timestamp(start))
+            last = index.searchsorted(pd.Timestamp(end), side='right') - 1
+            if first > last:
+                continue
+            before = growth.iloc[first - 1] if first > 0 else 0.0
+            total = np.expm1(growth.iloc[last] - before)
+            scenarios[name] = total.where(self._started.iloc[first])
+        return pd.DataFrame(scenarios, index=self.factors).T
+
+    def rolling_scenarios(self, horizon: int = 10) -> pd.DataFrame:
+        """
+        Every historical ``horizon``-day window as a scenario, indexed by its end date
+
+        As for ``historical_scenarios``, a factor is NaN only in windows
+        starting before its first observation.
+        """
+        growth = self._growth
+        total = np.expm1(growth - growth.shift(horizon))
+        return total.where(self._started.shift(horizon - 1, fill_value=False)).iloc[horizon:]
+
+    def stressed_covariance(self, correlation_stress: float) -> pd.DataFrame:
+        """Covariance with correlations pushed towards one: (1 - w) * C + w"""
+        vol = np.sqrt(np.diag(self.covariance))
+        correlation = self.covariance.to_numpy() / np.outer(vol, vol)
+        stressed = (1 - correlation_stress) * correlation + correlation_stress
+        np.fill_diagonal(stressed, 1.0)
+        return pd.DataFrame(stressed * np.outer(vol, vol), index=self.factors, columns=self.factors)
+
+    def _propagate(self, shocks: np.ndarray, covariance: np.ndarray) -> np.ndarray:
+        """Fill NaN shocks with their conditional expectation given the specified ones"""
+        missing = np.isnan(shocks)
+        if not missing.any():
+            return shocks
+
+        shocks = shocks.copy()
+        # One solve per distinct pattern of specified factors
+        patterns, inverse = np.unique(missing, axis=0, return_inverse=True)
+        for p, pattern in enumerate(patterns):
+            rows = np.flatnonzero(inverse.ravel() == p)
+            known = ~pattern
+            if not pattern.any():
+                continue
+            if not known.any():
+                shocks[np.ix_(rows, pattern)] = 0.0
+                continue
+            beta = np.linalg.lstsq(
+                covariance[np.ix_(known, known)], covariance[np.ix_(known, pattern)], rcond=None
+            )[0]
+            shocks[np.ix_(rows, pattern)] = shocks[np.ix_(rows, known)] @ beta
+        return shocks
+
+    def run(self,
+            scenarios: pd.DataFrame,
+            positions: Union[pd.Series, pd.DataFrame],
+            vol_scaled: bool = False,
+            correlation_stress: Optional[float] = None,
+            propagate: bool = True) -> pd.DataFrame:
+        """
+        P&L of every scenario for a book (or several books) of positions
+
+        Parameters:
+        -----------
+        scenarios : pd.DataFrame
+            Scenarios x factors shocks. NaN marks a factor the scenario
+            does not specify.
+        positions : pd.Series or pd.DataFrame
+            Exposure (market value) per factor, or factors x books
+        vol_scaled : bool
+            Shocks are in units of each factor's current volatility
+            (e.g. -3 = a three-sigma fall) rather than returns
+        correlation_stress : float, optional
+            Weight in [0, 1] pushing correlations towards one before
+            unspecified shocks are filled in
+        propagate : bool
+            Fill unspecified shocks with their conditional expectation
+            given the specified ones (otherwise they are zero)
+
+        Returns:
+        --------
+        pd.DataFrame
+            Scenarios sorted from worst to best: 'pnl' and 'return' for a
+            single book, or one P&L column per book and 'total'
+        """
+        shocks = scenarios.reindex(columns=self.factors).to_numpy(dtype=np.float64)
+        if vol_scaled:
+            shocks = shocks * self.current_vol.to_numpy()
+
+        if propagate:
+            covariance = (self.stressed_covariance(correlation_stress) if correlation_stress is not None
+                          else self.covariance).to_numpy()
+            shocks = self._propagate(shocks, np.nan_to_num(covariance))
+        shocks = np.nan_to_num(shocks)
+
+        if isinstance(positions, pd.Series):
+            exposure = positions.reindex(self.factors).fillna(0.0).to_numpy(dtype=np.float64)
+            pnl = shocks @ exposure
+            gross = np.abs(exposure).sum()
+            table = pd.DataFrame({'pnl': pnl, 'return': pnl / gross if gross else np.nan},
+                                 index=scenarios.index)
+            return table.sort_values('pnl')
+
+        exposure = positions.reindex(self.factors).fillna(0.0).to_numpy(dtype=np.float64)
+        table = pd.DataFrame(shocks @ exposure, index=scenarios.index, columns=positions.columns)
+        table['total'] = table.sum(axis=1)
+        return table.sort_values('total')
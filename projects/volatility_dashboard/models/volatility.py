@@ -3,10 +3,14 @@
 import numpy as np
 import pandas as pd
 from arch import arch_model
-from typing import Tuple, Dict, Optional
+from typing import Tuple, Dict, Optional, Union
 from dataclasses import dataclass
 from scipy import stats
 
+from models.cache import ModelCache
+from models.garch import GarchModel
+from utils.runs import RunLengths, run_lengths
+
 @dataclass
 class VolatilityRegime:
     current_volatility: float
@@ -15,10 +19,11 @@ class VolatilityRegime:
     risk_factor: float
 
 class VolatilityAnalyzer:
-    def __init__(self, returns: pd.Series, lookback: int = 252):
+    def __init__(self, returns: pd.Series, lookback: int = 252, cache: Optional[ModelCache] = None):
         # Data cleaning and validation
         self.returns = self._clean_returns(returns)
         self.lookback = lookback
+        self.cache = cache
         self.model = None
         self.result = None
         self.volatility = None
@@ -66,36 +71,11 @@ class VolatilityAnalyzer:
     def fit_garch(self) -> None:
         """Fit GARCH(1,1) model to returns with robust error handling"""
         try:
-            # Scale returns for numerical stability
-            scaled_returns = self.returns * 100
-            
-            # Additional validation
-            if scaled_returns.isnull().any():
-                raise ValueError("NaN values found in scaled returns")
-            
-            if scaled_returns.empty:
-                raise ValueError("No data available for GARCH fitting")
-            
-            # Initialize and fit GARCH model
-            self.model = arch_model(
-                scaled_returns,
-                vol='Garch',
-                p=1,
-                q=1,
-                rescale=True
-            )
-            
-            self.result = self.model.fit(
-                disp='off',
-                show_warning=False,
-                update_freq=0
-            )
-            
-            # Scale volatility back to original scale
-            self.volatility = pd.Series(
-                self.result.conditional_volatility / 100,
-                index=self.returns.index
-            )
+            # Fit GARCH(1,1), or rebuild it from the cache without optimizing
+            garch = GarchModel(self.returns, p=1, q=1, vol='Garch', cache=self.cache)
+            self.volatility = garch.fit().volatility
+            self.model = garch.model
+            self.result = garch.results
             
             # Validate output
             if self.volatility.isnull().any():
@@ -161,13 +141,14 @@ class VolatilityAnalyzer:
             low_vol = self.volatility < (vol_mean - vol_std)
             normal_vol = ~(high_vol | low_vol)
             
-            # Calculate cluster persistence
-            high_vol_persistence = self._calculate_cluster_persistence(high_vol)
-            low_vol_persistence = self._calculate_cluster_persistence(low_vol)
+            # Calculate cluster persistence for both masks at once
+            persistence = self._calculate_cluster_persistence(
+                pd.DataFrame({'high': high_vol, 'low': low_vol})
+            ).persistence
             
             # Only include clusters that persist for at least 5 days
-            high_vol = high_vol & (high_vol_persistence >= 5)
-            low_vol = low_vol & (low_vol_persistence >= 5)
+            high_vol = high_vol & (persistence['high'] >= 5)
+            low_vol = low_vol & (persistence['low'] >= 5)
             normal_vol = ~(high_vol | low_vol)
             
             return {
@@ -185,19 +166,17 @@ class VolatilityAnalyzer:
                 'normal_volatility': empty_series
             }
     
-    def _calculate_cluster_persistence(self, mask: pd.Series) -> pd.Series:
-        """Calculate how long each regime persists"""
-        persistence = pd.Series(0, index=mask.index)
-        current_count = 0
+    def _calculate_cluster_persistence(self, masks: Union[pd.Series, pd.DataFrame]) -> Union[pd.Series, RunLengths]:
+        """Calculate how long each regime persists
         
-        for i, value in enumerate(mask):
-            if value:
-                current_count += 1
-            else:
-                current_count = 0
-            persistence.iloc[i] = current_count
-            
-        return persistence
+        A single mask gives the running count of consecutive True values as
+        before; a frame of masks gives the full ``RunLengths`` (running
+        counts plus run start/end indices) for all of them in one pass.
+        """
+        result = run_lengths(masks)
+        if isinstance(masks, pd.Series):
+            return result.persistence.iloc[:, 0].rename(masks.name)
+        return result
 
     def forecast_volatility(self, horizon: int = 5) -> pd.Series:
         """Forecast volatility for next n days"""
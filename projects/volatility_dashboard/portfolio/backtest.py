@@ -0,0 +1,220 @@
+# portfolio/backtest.py
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+from portfolio.optimization import (
+    max_return_weights,
+    max_sharpe_weights,
+    min_variance_weights,
+    risk_budget_weights,
+    target_volatility_weights
+)
+
+STRATEGIES = ('max_sharpe', 'target_volatility', 'min_variance', 'risk_parity', 'equal_weight')
+
+@dataclass
+class BacktestResult:
+    weights: pd.DataFrame  # Target weights set at each rebalance close
+    turnover: pd.Series    # Sum of |trade| per rebalance, as a fraction of equity
+    returns: pd.Series     # Daily portfolio returns after transaction costs
+
+    @property
+    def equity(self) -> pd.Series:
+        """Growth of one unit of capital"""
+        return (1 + self.returns).cumprod()
+
+    def summary(self) -> Dict:
+        """Annualized performance and average turnover"""
+        equity = self.equity
+        years = len(self.returns) / 252
+        volatility = self.returns.std() * np.sqrt(252)
+        return {
+            'annual_return': equity.iloc[-1] ** (1 / years) - 1 if years > 0 else np.nan,
+            'annual_volatility': volatility,
+            'sharpe_ratio': self.returns.mean() * 252 / volatility if volatility > 0 else np.nan,
+            'max_drawdown': (equity / equity.cummax() - 1).min(),
+            'average_turnover': self.turnover.mean(),
+            'rebalances': len(self.weights)
+        }
+
+class _RollingMoments:
+    """Sums of returns and cross products over a sliding window of rows"""
+
+    def __init__(self, values: np.ndarray, window: Optional[int]):
+        self.values = values
+        self.window = window
+        self.end = 0
+        n = values.shape[1]
+        self.total = np.zeros(n)
+        self.cross = np.zeros((n, n))
+
+    def advance(self, end: int):
+        """Move the window to end at row ``end`` (exclusive): O(rows moved * N^2)"""
+        added = self.values[self.end:end]
+        self.total += added.sum(axis=0)
+        self.cross += added.T @ added
+        if self.window is not None:
+            removed = self.values[max(self.end - self.window, 0):max(end - self.window, 0)]
+            self.total -= removed.sum(axis=0)
+            self.cross -= removed.T @ removed
+        self.end = end
+
+    @property
+    def count(self) -> int:
+        return self.end if self.window is None else min(self.end, self.window)
+
+    def mean(self) -> np.ndarray:
+        return self.total / self.count
+
+    def covariance(self) -> np.ndarray:
+        m = self.count
+        return (self.cross - np.outer(self.total, self.total) / m) / (m - 1)
+
+class WalkForwardBacktest:
+    def __init__(self,
+                 returns: pd.DataFrame,
+                 strategy: str = 'max_sharpe',
+                 frequency: Union[str, int] = 'ME',
+                 window: Optional[int] = 252,
+                 min_history: Optional[int] = None,
+                 risk_free_rate: float = 0.02,
+                 target_volatility: Optional[float] = None,
+                 max_weight: float = 1.0,
+                 budgets: Optional[np.ndarray] = None,
+                 transaction_cost: float = 0.0):
+        """
+        Walk-forward allocation with the ``PortfolioOptimizer`` solvers
+
+        Parameters:
+        -----------
+        returns : pd.DataFrame
+            Daily asset returns, dates x symbols. Dates with a missing
+            value are dropped.
+        strategy : str
+            One of STRATEGIES
+        frequency : str or int
+            Rebalance at the last date of each pandas period ('ME', 'W-FRI',
+            'QE', ...) or every ``frequency`` rows
+        window : int, optional
+            Rolling estimation window in days (None: expanding)
+        min_history : int, optional
+            Days required before the first rebalance (default: ``window``,
+            or 63 when expanding)
+        risk_free_rate : float
+            Annual risk-free rate for the Sharpe objective
+        target_volatility : float, optional
+            Annualized volatility target ('target_volatility' strategy)
+        max_weight : float
+            Cap per asset
+        budgets : np.ndarray, optional
+            Risk budgets ('risk_parity' strategy; default equal)
+        transaction_cost : float
+            Cost per unit of turnover, charged on the first day a
+            rebalance is held (0.001 = 10 bp)
+
+        Weights are set with data up to a rebalance date's close and held,
+        drifting with prices, until the next one. The window's sums of
+        returns and cross products are rolled forward between rebalances
+        rather than recomputed, and each optimization is warm-started from
+        the previous weights, whose active set rarely changes much from one
+        rebalance to the next. Risk-parity weights for all dates are solved
+        in one batched call.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}', expected one of {STRATEGIES}")
+        if strategy == 'target_volatility' and not target_volatility:
+            raise ValueError("The target_volatility strategy needs a target_volatility")
+
+        self.returns = returns.dropna()
+        self.strategy = strategy
+        self.frequency = frequency
+        self.window = window
+        self.min_history = min_history or window or 63
+        self.risk_free_rate = risk_free_rate
+        self.target_volatility = target_volatility
+        self.max_weight = max_weight
+        self.budgets = budgets
+        self.transaction_cost = transaction_cost
+
+    def rebalance_positions(self) -> np.ndarray:
+        """Row positions of the rebalance dates"""
+        n = len(self.returns)
+        if isinstance(self.frequency, int):
+            positions = np.arange(self.min_history - 1, n, self.frequency)
+        else:
+            rows = pd.Series(np.arange(n), index=self.returns.index)
+            positions = rows.resample(self.frequency).last().dropna().to_numpy(dtype=int)
+            positions = positions[positions >= self.min_history - 1]
+        # The last date has no holding period after it
+        return positions[positions < n - 1]
+
+    def _target_weights(self, positions: np.ndarray) -> np.ndarray:
+        values = self.returns.to_numpy(dtype=np.float64)
+        n_assets = values.shape[1]
+        if self.strategy == 'equal_weight':
+            return np.full((len(positions), n_assets), 1.0 / n_assets)
+
+        moments = _RollingMoments(values, self.window)
+        if self.strategy == 'risk_parity':
+            covariances = np.empty((len(positions), n_assets, n_assets))
+            for i, position in enumerate(positions):
+                moments.advance(position + 1)
+                covariances[i] = moments.covariance()
+            return risk_budget_weights(covariances, self.budgets)
+
+        weights = np.empty((len(positions), n_assets))
+        previous = None
+        for i, position in enumerate(positions):
+            moments.advance(position + 1)
+            cov = moments.covariance() * 252
+            if self.strategy == 'min_variance':
+                w = min_variance_weights(cov, self.max_weight, start=previous)
+            else:
+                mean = moments.mean() * 252
+                if self.strategy == 'target_volatility':
+                    w = target_volatility_weights(mean, cov, self.target_volatility,
+                                                  self.max_weight, start=previous)
+                elif mean @ max_return_weights(mean, self.max_weight) <= self.risk_free_rate:
+                    # No portfolio within the caps beats cash: hold the least risky one
+                    w = min_variance_weights(cov, self.max_weight, start=previous)
+                else:
+                    w = max_sharpe_weights(mean, cov, self.risk_free_rate,
+                                           self.max_weight, start=previous)
+            weights[i] = previous = w
+        return weights
+
+    def run(self) -> BacktestResult:
+        """Rebalance through the history; returns weights, turnover and daily P&L"""
+        positions = self.rebalance_positions()
+        if len(positions) == 0:
+            raise ValueError("Not enough history for a rebalance")
+
+        values = self.returns.to_numpy(dtype=np.float64)
+        targets = self._target_weights(positions)
+        ends = np.append(positions[1:], len(values) - 1)
+
+        portfolio = np.zeros(len(values))
+        turnover = np.empty(len(positions))
+        held = np.zeros(values.shape[1])
+        for i, (position, end) in enumerate(zip(positions, ends)):
+            w = targets[i]
+            turnover[i] = np.abs(w - held).sum()
+
+            # Buy and hold from the next day through the next rebalance date
+            growth = np.cumprod(1 + values[position + 1:end + 1], axis=0)
+            value = growth @ w
+            daily = np.diff(value, prepend=1.0) / np.concatenate(([1.0], value[:-1]))
+            daily[0] -= self.transaction_cost * turnover[i]
+            portfolio[position + 1:end + 1] = daily
+            held = w * growth[-1] / value[-1]
+
+        index = self.returns.index
+        columns = self.returns.columns
+        rebalance_dates = index[positions]
+        return BacktestResult(
+            weights=pd.DataFrame(targets, index=rebalance_dates, columns=columns),
+            turnover=pd.Series(turnover, index=rebalance_dates, name='turnover'),
+            returns=pd.Series(portfolio[positions[0] + 1:], index=index[positions[0] + 1:], name='returns')
+        )
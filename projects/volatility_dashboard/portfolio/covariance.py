@@ -0,0 +1,278 @@
+# portfolio/covariance.py
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Union
+from sklearn.covariance import LedoitWolf
+
+from utils.rolling import data_version
+
+class EWMACovariance:
+    def __init__(self, symbols: List[str], decay: float = 0.94):
+        """
+        Exponentially weighted (RiskMetrics) covariance, updated bar by bar
+
+        Parameters:
+        -----------
+        symbols : List[str]
+            Symbols tracked, in matrix order
+        decay : float
+            Weight of the previous estimate (0.94 = RiskMetrics daily)
+
+        Returns are taken as zero-mean, as in RiskMetrics. Alongside the
+        weighted sum of cross products the tracker keeps, per pair, the
+        total weight of the bars both symbols had, so early estimates are
+        not biased towards zero and a missing value only leaves the pairs
+        involving that symbol untouched.
+        """
+        self.symbols = list(symbols)
+        self.decay = decay
+        n = len(self.symbols)
+        self._cross = np.zeros((n, n))   # Weighted sum of r_i * r_j
+        self._weight = np.zeros((n, n))  # Weighted count of bars per pair
+        self.n_updates = 0
+
+    @classmethod
+    def from_returns(cls, returns: pd.DataFrame, decay: float = 0.94) -> 'EWMACovariance':
+        """Tracker warmed up on a history of returns"""
+        tracker = cls(list(returns.columns), decay)
+        tracker.update_batch(returns)
+        return tracker
+
+    def update(self, returns: Union[pd.Series, np.ndarray]):
+        """Add one bar of returns (NaN = no observation); O(N^2)"""
+        if isinstance(returns, pd.Series):
+            returns = returns.reindex(self.symbols)
+        r = np.asarray(returns, dtype=np.float64)
+        valid = ~np.isnan(r)
+
+        if valid.all():
+            self._cross *= self.decay
+            self._cross += (1 - self.decay) * np.outer(r, r)
+            self._weight *= self.decay
+            self._weight += 1 - self.decay
+        else:
+            pairs = np.ix_(valid, valid)
+            r = r[valid]
+            self._cross[pairs] = self.decay * self._cross[pairs] + (1 - self.decay) * np.outer(r, r)
+            self._weight[pairs] = self.decay * self._weight[pairs] + (1 - self.decay)
+        self.n_updates += 1
+
+    def update_batch(self, returns: pd.DataFrame):
+        """
+        Add several bars at once
+
+        Without missing values the whole batch is one weighted matrix
+        product; bars with missing values fall back to ``update``.
+        """
+        values = returns.reindex(columns=self.symbols).to_numpy(dtype=np.float64)
+        if np.isnan(values).any():
+            for row in values:
+                self.update(row)
+            return
+
+        n = len(values)
+        if n == 0:
+            return
+        # Weight of bar t after the batch: (1 - decay) * decay^(n - 1 - t)
+        weights = (1 - self.decay) * self.decay ** np.arange(n - 1, -1, -1)
+        carry = self.decay ** n
+        self._cross = carry * self._cross + (values * weights[:, None]).T @ values
+        self._weight = carry * self._weight + weights.sum()
+        self.n_updates += n
+
+    def covariance(self, annualize: bool = False) -> pd.DataFrame:
+        """Current covariance matrix (NaN for pairs never observed together)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = self._cross / self._weight
+        if annualize:
+            cov = cov * 252
+        return pd.DataFrame(cov, index=self.symbols, columns=self.symbols)
+
+    def volatility(self, annualize: bool = False) -> pd.Series:
+        """Current volatility per symbol"""
+        vol = np.sqrt(np.diag(self.covariance(annualize).to_numpy()))
+        return pd.Series(vol, index=self.symbols)
+
+    def correlation(self) -> pd.DataFrame:
+        """Current correlation matrix"""
+        cov = self.covariance().to_numpy()
+        vol = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.outer(vol, vol)
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
+    def snapshot(self) -> Dict:
+        """Copy of the tracker state, e.g. for session storage or a rollback"""
+        return {
+            'symbols': list(self.symbols),
+            'decay': self.decay,
+            'cross': self._cross.copy(),
+            'weight': self._weight.copy(),
+            'n_updates': self.n_updates
+        }
+
+    @classmethod
+    def restore(cls, state: Dict) -> 'EWMACovariance':
+        """Tracker rebuilt from a ``snapshot``"""
+        tracker = cls(state['symbols'], state['decay'])
+        tracker._cross = state['cross'].copy()
+        tracker._weight = state['weight'].copy()
+        tracker.n_updates = state['n_updates']
+        return tracker
+
+class FactorCovariance:
+    # Make numpy defer ``array @ FactorCovariance`` to __rmatmul__
+    __array_ufunc__ = None
+
+    def __init__(self, loadings: np.ndarray, specific: np.ndarray):
+        """
+        Covariance with low-rank plus diagonal structure, L L' + diag(d)
+
+        Parameters:
+        -----------
+        loadings : np.ndarray
+            Factor loadings L (N x K), scaled so the factors have unit
+            variance and are uncorrelated
+        specific : np.ndarray
+            Positive specific (idiosyncratic) variances d (N)
+
+        Only the N x K loadings are stored. Products cost O(N K) and
+        systems are solved with the Woodbury identity, which inverts a
+        K x K matrix instead of the N x N covariance.
+        """
+        self.loadings = np.asarray(loadings, dtype=np.float64)
+        self.specific = np.asarray(specific, dtype=np.float64)
+
+    @property
+    def shape(self):
+        n = len(self.specific)
+        return (n, n)
+
+    def __len__(self) -> int:
+        return len(self.specific)
+
+    def __matmul__(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        specific = self.specific if x.ndim == 1 else self.specific[:, None]
+        return self.loadings @ (self.loadings.T @ x) + specific * x
+
+    def __rmatmul__(self, x):
+        # Symmetric: x @ C = (C @ x')'
+        return (self @ np.asarray(x, dtype=np.float64).T).T
+
+    def __mul__(self, scale: float) -> 'FactorCovariance':
+        return FactorCovariance(self.loadings * np.sqrt(scale), self.specific * scale)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scale: float) -> 'FactorCovariance':
+        return self * (1 / scale)
+
+    def diagonal(self) -> np.ndarray:
+        return np.einsum('ik,ik->i', self.loadings, self.loadings) + self.specific
+
+    def to_dense(self) -> np.ndarray:
+        """Full N x N matrix (O(N^2) memory)"""
+        return self.loadings @ self.loadings.T + np.diag(self.specific)
+
+    def solve(self,
+              b: np.ndarray,
+              subset: Optional[np.ndarray] = None,
+              extra_diagonal: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Solve C x = b by the Woodbury identity in O(N K^2)
+
+        ``subset`` restricts C to the rows and columns of those assets
+        (b then has one row per subset asset); ``extra_diagonal`` is added
+        to the specific variances first.
+        """
+        L = self.loadings if subset is None else self.loadings[subset]
+        d = self.specific if subset is None else self.specific[subset]
+        if extra_diagonal is not None:
+            d = d + extra_diagonal
+        b = np.asarray(b, dtype=np.float64)
+        inverse_d = 1 / d if b.ndim == 1 else (1 / d)[:, None]
+
+        # (D + L L')^-1 = D^-1 - D^-1 L (I + L' D^-1 L)^-1 L' D^-1
+        scaled = L / d[:, None]
+        capacitance = np.eye(L.shape[1]) + L.T @ scaled
+        return inverse_d * b - scaled @ np.linalg.solve(capacitance, scaled.T @ b)
+
+# Covariance estimators: daily returns (dates x symbols) -> daily covariance
+ESTIMATORS: Dict[str, Callable[[pd.DataFrame], Union[np.ndarray, FactorCovariance]]] = {}
+
+def register(name: str):
+    """Add an estimator to the registry used by ``PortfolioOptimizer``"""
+    def decorator(func):
+        ESTIMATORS[name] = func
+        return func
+    return decorator
+
+# Least-recently-used estimates keyed on (estimator, data version), shared by
+# every optimizer in the process (Streamlit rebuilds them on each rerun)
+MAX_CACHED_ESTIMATES = 8
+_estimates: 'OrderedDict[tuple, Union[np.ndarray, FactorCovariance]]' = OrderedDict()
+_estimates_lock = threading.Lock()
+
+def cached_estimate(returns: pd.DataFrame,
+                    estimator: Callable[[pd.DataFrame], Union[np.ndarray, FactorCovariance]],
+                    version: Optional[str] = None) -> Union[np.ndarray, FactorCovariance]:
+    """
+    Daily covariance estimate of ``returns``, computed once per content
+
+    ``version`` is the returns' ``data_version`` fingerprint (computed if
+    not given), so any change to the data, including reassigning it,
+    makes a new entry. Arrays are returned read-only as they are shared.
+    """
+    key = (estimator, version or data_version(returns))
+    with _estimates_lock:
+        if key in _estimates:
+            _estimates.move_to_end(key)
+            return _estimates[key]
+
+    estimate = estimator(returns)
+    if not isinstance(estimate, FactorCovariance):
+        estimate = np.array(estimate, dtype=np.float64)
+        estimate.setflags(write=False)
+    with _estimates_lock:
+        _estimates[key] = estimate
+        while len(_estimates) > MAX_CACHED_ESTIMATES:
+            _estimates.popitem(last=False)
+    return estimate
+
+@register('sample')
+def sample_covariance(returns: pd.DataFrame) -> np.ndarray:
+    """Sample covariance (pairwise complete observations)"""
+    return returns.cov().to_numpy()
+
+@register('ledoit_wolf')
+def ledoit_wolf_covariance(returns: pd.DataFrame) -> np.ndarray:
+    """
+    Ledoit-Wolf shrinkage towards a scaled identity
+
+    Well-conditioned even with more assets than observations. Dates with
+    a missing value are dropped.
+    """
+    return LedoitWolf().fit(returns.dropna().to_numpy(dtype=np.float64)).covariance_
+
+@register('pca')
+def pca_factor_covariance(returns: pd.DataFrame, n_factors: int = 5) -> FactorCovariance:
+    """
+    Statistical factor model from the leading principal components
+
+    The top ``n_factors`` components of the demeaned returns explain the
+    common variance; what is left of each asset's sample variance is its
+    specific variance (floored to keep the matrix positive definite).
+    Dates with a missing value are dropped.
+    """
+    values = returns.dropna().to_numpy(dtype=np.float64)
+    values = values - values.mean(axis=0)
+    _, singular, components = np.linalg.svd(values / np.sqrt(len(values) - 1), full_matrices=False)
+    k = min(n_factors, len(singular))
+    loadings = components[:k].T * singular[:k]
+
+    variances = np.einsum('ti,ti->i', values, values) / (len(values) - 1)
+    specific = variances - np.einsum('ik,ik->i', loadings, loadings)
+    return FactorCovariance(loadings, np.maximum(specific, 1e-4 * variances.mean()))
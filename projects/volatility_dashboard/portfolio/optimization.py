@@ -1,76 +1,931 @@
 # portfolio/optimization.py
+import multiprocessing
+import warnings
 import pandas as pd
 import numpy as np
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from scipy.optimize import minimize
+from scipy.stats import norm
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from portfolio.covariance import ESTIMATORS, EWMACovariance, FactorCovariance, cached_estimate
+from utils.rolling import data_version
+
+Covariance = Union[np.ndarray, FactorCovariance]
+
+def _solve(objective, x0: np.ndarray, bounds, constraints) -> np.ndarray:
+    """SLSQP with analytic gradients (``objective`` returns value and gradient)"""
+    result = minimize(
+        objective,
+        x0,
+        jac=True,
+        method='SLSQP',
+        bounds=bounds,
+        constraints=constraints,
+        options={'maxiter': 500, 'ftol': 1e-12}
+    )
+    if not result.success:
+        print(f"Warning: portfolio optimization did not converge: {result.message}")
+    return result.x
+
+def _as_covariance(cov) -> Covariance:
+    """Dense covariance as a float array; factor covariances are kept as they are"""
+    return cov if isinstance(cov, FactorCovariance) else np.asarray(cov, dtype=np.float64)
+
+def _free_set_solve(Q: Covariance,
+                    F: np.ndarray,
+                    X: np.ndarray,
+                    w: np.ndarray,
+                    c: np.ndarray,
+                    a: np.ndarray,
+                    b: float) -> Tuple[np.ndarray, float]:
+    """
+    KKT system of min 1/2 w'Qw - c'w s.t. a'w = b over the free assets F,
+    the others held at w[X]; returns w[F] and the multiplier of a'w = b
+    """
+    if isinstance(Q, FactorCovariance):
+        # Q_FF is low rank plus diagonal: eliminate the multiplier with two Woodbury solves
+        held = np.zeros_like(w)
+        held[X] = w[X]
+        rhs = c[F] - (Q @ held)[F]
+        solutions = Q.solve(np.column_stack([rhs, a[F]]), subset=F)
+        nu = (a[F] @ solutions[:, 0] - (b - a[X] @ w[X])) / (a[F] @ solutions[:, 1])
+        return solutions[:, 0] - nu * solutions[:, 1], nu
+
+    k = len(F)
+    kkt = np.zeros((k + 1, k + 1))
+    kkt[:k, :k] = Q[np.ix_(F, F)]
+    kkt[:k, k] = kkt[k, :k] = a[F]
+    rhs = np.empty(k + 1)
+    rhs[:k] = c[F] - Q[np.ix_(F, X)] @ w[X]
+    rhs[k] = b - a[X] @ w[X]
+    try:
+        solution = np.linalg.solve(kkt, rhs)
+    except np.linalg.LinAlgError:
+        solution = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+    return solution[:k], solution[k]
+
+def _feasible_point(a: np.ndarray, b: float, upper: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """Point with a'w = b and 0 <= w <= upper, filling assets with a > 0 in ``order``"""
+    w = np.zeros(len(a))
+    remaining = b
+    for i in order:
+        if a[i] <= 0:
+            continue
+        w[i] = min(upper[i], remaining / a[i])
+        remaining -= a[i] * w[i]
+        if remaining <= 1e-15 * max(abs(b), 1.0):
+            return w
+    raise ValueError("Infeasible portfolio constraints: the weight caps cannot reach the budget")
+
+def _is_feasible(w: np.ndarray, a: np.ndarray, b: float, upper: np.ndarray, tol: float = 1e-8) -> bool:
+    """Finite, within 0 <= w <= upper and on a'w = b, up to ``tol``"""
+    return (np.isfinite(w).all() and (w >= -tol).all() and (w <= upper + tol).all()
+            and abs(a @ w - b) <= tol * max(abs(b), 1.0))
+
+def _primal_active_set(Q: Covariance,
+                       c: np.ndarray,
+                       a: np.ndarray,
+                       b: float,
+                       upper: np.ndarray,
+                       w: np.ndarray,
+                       tol: float = 1e-10) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+    """
+    Primal active-set method for the problem of ``_active_set_qp`` from a feasible ``w``
+
+    Iterates stay feasible and the objective never increases: each step
+    moves towards the free-set solution until a bound blocks it (which is
+    then held), and at a free-set optimum the held bound with the most
+    wrong-signed multiplier is released. Slower than block pivoting from
+    a good start, but it cannot cycle. Returns None at the iteration limit.
+    """
+    n = len(c)
+    w = w.copy()
+    at_upper = w >= upper
+    free = (w > 0) & ~at_upper
+    if not free.any():
+        # Freeing a variable at a bound does not move it; one is needed to carry a'w = b
+        free[np.flatnonzero(a != 0)[0]] = True
+        at_upper &= ~free
+
+    for _ in range(10 * n + 100):
+        F = np.flatnonzero(free)
+        X = np.flatnonzero(~free)
+        target, nu = _free_set_solve(Q, F, X, w, c, a, b)
+        step = target - w[F]
+
+        # Ratio test: how far towards the free-set solution before a bound is hit
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = np.where(step < -tol, w[F] / -step,
+                              np.where(step > tol, (upper[F] - w[F]) / step, np.inf))
+        blocking = int(np.argmin(ratios)) if len(F) else 0
+        if len(F) and ratios[blocking] < 1:
+            w[F] += ratios[blocking] * step
+            j = F[blocking]
+            at_upper[j] = step[blocking] > 0
+            w[j] = upper[j] if at_upper[j] else 0.0
+            free[j] = False
+            continue
+
+        w[F] = target
+        gradient = (Q @ w)[X] - c[X] + nu * a[X]
+        wrong = np.where(at_upper[X], gradient, -gradient)
+        if not len(X) or wrong.max() <= tol:
+            return np.clip(w, 0.0, upper), free, nu
+        j = X[np.argmax(wrong)]
+        free[j] = True
+        at_upper[j] = False
+    return None
+
+def _slsqp_qp(Q: Covariance,
+              c: np.ndarray,
+              a: np.ndarray,
+              b: float,
+              upper: np.ndarray,
+              w: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Last-resort SLSQP solve of the ``_active_set_qp`` problem, in the same return form"""
+    def objective(x):
+        qx = Q @ x
+        return 0.5 * x @ qx - c @ x, qx - c
+
+    bounds = [(0.0, None if np.isinf(u) else u) for u in upper]
+    constraints = {'type': 'eq', 'fun': lambda x: a @ x - b, 'jac': lambda x: a}
+    w = np.clip(_solve(objective, w, bounds, constraints), 0.0, upper)
+    free = (w > 1e-12) & (w < upper - 1e-12)
+    gradient = Q @ w - c
+    nu = -np.mean(gradient[free] / a[free]) if (free & (a != 0)).any() else 0.0
+    return w, free, nu
+
+def _active_set_qp(Q: Covariance,
+                   c: np.ndarray,
+                   a: np.ndarray,
+                   b: float,
+                   upper: np.ndarray,
+                   w: np.ndarray,
+                   free: np.ndarray,
+                   tol: float = 1e-10) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Block principal pivoting for min 1/2 w'Qw - c'w s.t. a'w = b, 0 <= w <= upper
+
+    Every variable is either free or held at one of its bounds. Each
+    iteration solves the equality-constrained problem on the free set only
+    (its KKT system), then moves every free variable that left its bounds
+    onto the bound and frees every held variable whose multiplier has the
+    wrong sign, all at once. Warm-starting from a neighbouring solution's
+    free set usually needs one or two solves. ``Q`` may be a
+    ``FactorCovariance``, whose free-set systems are solved in O(N K^2).
+
+    Block swaps can cycle, and with caps and the budget equality so can
+    single (Murty) swaps. If the number of violations stops falling, the
+    solve continues with ``_primal_active_set`` from a feasible point,
+    which cannot cycle. The result is checked against the constraints;
+    SLSQP is the last resort, and a ValueError is raised if even that
+    is infeasible.
+
+    Returns:
+    --------
+    Tuple[np.ndarray, np.ndarray, float]
+        Solution, its free set and the multiplier of the equality
+    """
+    n = len(c)
+    start = w
+    free = free.copy()
+    at_upper = ~free & (w >= upper)
+    w = np.where(at_upper, upper, np.where(free, w, 0.0))
+    best, retries = n + 1, 3
+    result = None
+
+    for _ in range(10 * n + 100):
+        if not free.any():
+            free[np.argmin(Q @ w - c)] = True
+            at_upper &= ~free
+        F = np.flatnonzero(free)
+        X = np.flatnonzero(~free)
+        w[X] = np.where(at_upper[X], upper[X], 0.0)
+        w[F], nu = _free_set_solve(Q, F, X, w, c, a, b)
+
+        # Multipliers of the held bounds: must be >= 0 at zero and <= 0 at the cap
+        gradient = (Q @ w)[X] - c[X] + nu * a[X]
+        below = F[w[F] < -tol]
+        above = F[w[F] > upper[F] + tol]
+        release = X[np.where(at_upper[X], gradient > tol, gradient < -tol)]
+        violations = len(below) + len(above) + len(release)
+        if violations == 0:
+            result = np.clip(w, 0.0, upper), free, nu
+            break
+
+        if violations < best:
+            best, retries = violations, 3
+        elif retries > 0:
+            retries -= 1
+        else:
+            break
+
+        free[below] = free[above] = False
+        at_upper[above] = True
+        free[release] = True
+        at_upper[release] = False
+
+    if result is None:
+        # Pivoting stalled: restart from the warm start if feasible, else from
+        # a feasible point filled in the order of the last iterate
+        if _is_feasible(start, a, b, upper):
+            feasible = np.clip(start, 0.0, upper)
+        else:
+            feasible = _feasible_point(a, b, upper, np.argsort(-np.clip(w, 0.0, upper), kind='stable'))
+        result = _primal_active_set(Q, c, a, b, upper, feasible, tol)
+
+    if result is None or not _is_feasible(result[0], a, b, upper):
+        warnings.warn("Portfolio QP did not converge by pivoting; falling back to SLSQP", RuntimeWarning)
+        result = _slsqp_qp(Q, c, a, b, upper, _feasible_point(a, b, upper, np.argsort(-np.clip(w, 0.0, upper))))
+        if not _is_feasible(result[0], a, b, upper, tol=1e-6):
+            raise ValueError("Portfolio optimization failed: no feasible solution found")
+    return result
+
+def _budget_start(order: np.ndarray, max_weight: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Feasible long-only vertex: fill assets in ``order`` up to ``max_weight`` until fully invested"""
+    n = len(order)
+    w = np.zeros(n)
+    free = np.zeros(n, dtype=bool)
+    remaining = 1.0
+    for i in order:
+        w[i] = min(max_weight, remaining)
+        remaining -= w[i]
+        if remaining <= 1e-15:
+            free[i] = True
+            break
+    return w, free
+
+def _normalized(cov: Covariance) -> Tuple[Covariance, float]:
+    """Covariance scaled to unit average variance, so tolerances are relative"""
+    scale = np.mean(cov.diagonal())
+    return cov / scale, scale
+
+def _warm_start(start: np.ndarray, upper: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Previous solution as a pivoting start: assets strictly inside their bounds are free"""
+    w = np.clip(np.asarray(start, dtype=np.float64), 0.0, upper)
+    return w, (w > 1e-12) & (w < upper - 1e-12)
+
+def min_variance_weights(cov: Covariance,
+                         max_weight: float = 1.0,
+                         start: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Long-only minimum-variance weights
+
+    Solves min w'Cw subject to sum(w) = 1 and 0 <= w <= max_weight as a
+    quadratic program (``_active_set_qp``) starting from the
+    lowest-variance assets, so no gradients are differenced. ``start``
+    (e.g. the previous rebalance's weights) seeds the active set instead.
+    """
+    Q, _ = _normalized(_as_covariance(cov))
+    n = len(Q)
+    if start is None:
+        w, free = _budget_start(np.argsort(Q.diagonal()), max_weight)
+    else:
+        w, free = _warm_start(start, max_weight)
+    w, _, _ = _active_set_qp(Q, np.zeros(n), np.ones(n), 1.0, np.full(n, max_weight), w, free)
+    return w
+
+def max_sharpe_weights(mean: np.ndarray,
+                       cov: Covariance,
+                       risk_free_rate: float = 0.0,
+                       max_weight: float = 1.0,
+                       start: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Long-only maximum Sharpe ratio weights
+
+    The Sharpe ratio is maximized through its convex reformulation
+    min y'Cy subject to (mean - rf)'y = 1, y >= 0, with w = y / sum(y);
+    unlike the ratio itself this is a quadratic program with a unique
+    optimum. With a ``max_weight`` cap the caps y <= max_weight * sum(y)
+    couple every y, so the capped problem is solved on the frontier
+    instead (``_tangency_point``). ``start`` weights seed the active set.
+    """
+    mean = np.asarray(mean, dtype=np.float64)
+    Q, _ = _normalized(_as_covariance(cov))
+    n = len(mean)
+    excess = mean - risk_free_rate
+    if (excess <= 0).all():
+        raise ValueError("No asset has an expected return above the risk-free rate")
+    excess = excess / excess.max()
+    if start is not None:
+        start = np.clip(np.asarray(start, dtype=np.float64), 0.0, None)
+        if excess @ start <= 0:
+            start = None
+
+    if max_weight >= 1 and start is not None:
+        y, free = _warm_start(start / (excess @ start), np.inf)
+        y, _, _ = _active_set_qp(Q, np.zeros(n), excess, 1.0, np.full(n, np.inf), y, free)
+    elif max_weight >= 1:
+        # Start from the best single asset
+        best = np.argmax(np.where(excess > 0, excess / np.sqrt(Q.diagonal()), -np.inf))
+        y = np.zeros(n)
+        y[best] = 1 / excess[best]
+        free = np.zeros(n, dtype=bool)
+        free[best] = True
+        y, _, _ = _active_set_qp(Q, np.zeros(n), excess, 1.0, np.full(n, np.inf), y, free)
+    else:
+        if excess @ max_return_weights(excess, max_weight) <= 0:
+            raise ValueError("No portfolio within max_weight has an expected return above the risk-free rate")
+        if start is None:
+            w, free = _budget_start(np.argsort(Q.diagonal()), max_weight)
+        else:
+            w, free = _warm_start(start / start.sum(), max_weight)
+        return _tangency_point(excess, Q, max_weight, (w, free, 1.0))
+    return y / y.sum()
+
+def _tangency_point(excess: np.ndarray,
+                    Q: Covariance,
+                    max_weight: float,
+                    start: Tuple[np.ndarray, np.ndarray, float]) -> np.ndarray:
+    """
+    Capped maximum Sharpe ratio portfolio: the frontier portfolio
+    min 1/2 w'Qw - t excess'w at which w'Qw = t excess'w
+
+    That equality is the Sharpe ratio's first-order condition. Within one
+    active set w = w0 + t d with d'Qd = excess'd, so w'Qw - t excess'w is
+    linear in t and solved exactly; the QP is re-solved at that t until
+    the active set stops changing, as in ``_frontier_point``. The gap is
+    positive below the tangency and negative above it, which brackets
+    the steps. A point that misses the condition is re-solved by SLSQP.
+    """
+    n = len(excess)
+    ones = np.ones(n)
+    upper = np.full(n, max_weight)
+    w, free, t = start
+    low, high = 0.0, np.inf
+
+    for _ in range(100):
+        w, free, _ = _active_set_qp(Q, t * excess, ones, 1.0, upper, w, free)
+        variance = w @ Q @ w
+        gap = variance - t * (excess @ w)
+        if abs(gap) <= 1e-10 * variance:
+            break
+        if gap > 0:
+            low = t
+        else:
+            high = t
+
+        # Direction of the solution in t for the current free set
+        d = np.zeros(n)
+        F, X = np.flatnonzero(free), np.flatnonzero(~free)
+        d[F] = _free_set_solve(Q, F, X, d, excess, ones, 0.0)[0]
+        w0 = w - t * d
+
+        slope = 2 * w0 @ Q @ d - excess @ w0
+        candidate = -(w0 @ Q @ w0) / slope if slope < 0 else np.nan
+        if not (low < candidate < high):
+            candidate = 2 * t + 1 if np.isinf(high) else (low + high) / 2
+        t = candidate
+
+    if not _is_feasible(w, ones, 1.0, upper) or not abs(gap) <= 1e-6 * variance:
+        warnings.warn("Maximum Sharpe ratio portfolio did not converge; falling back to SLSQP", RuntimeWarning)
+        w = _slsqp_tangency_point(excess, Q, max_weight)
+    return w
+
+def _slsqp_tangency_point(excess: np.ndarray, Q: Covariance, max_weight: float) -> np.ndarray:
+    """Last-resort capped maximum Sharpe ratio: min y'Qy, excess'y = 1, y <= max_weight * sum(y) by SLSQP"""
+    n = len(excess)
+
+    def objective(y):
+        qy = Q @ y
+        return y @ qy, 2 * qy
+
+    cap = max_weight * np.ones((n, n)) - np.eye(n)
+    constraints = [
+        {'type': 'eq', 'fun': lambda y: excess @ y - 1, 'jac': lambda y: excess},
+        {'type': 'ineq', 'fun': lambda y: cap @ y, 'jac': lambda y: cap}
+    ]
+    y0 = np.where(excess > 0, 1.0, 0.0)
+    y = np.clip(_solve(objective, y0 / (excess @ y0), [(0, None)] * n, constraints), 0, None)
+    w = y / y.sum()
+    if not _is_feasible(w, np.ones(n), 1.0, np.full(n, max_weight), tol=1e-6):
+        raise ValueError("Portfolio optimization failed: no feasible solution found")
+    return w
+
+def max_return_weights(mean: np.ndarray, max_weight: float = 1.0) -> np.ndarray:
+    """Long-only maximum-return weights: fill the best assets up to ``max_weight``"""
+    return _budget_start(np.argsort(-np.asarray(mean, dtype=np.float64)), max_weight)[0]
+
+def _frontier_point(mean: np.ndarray,
+                    Q: Covariance,
+                    target_variance: float,
+                    max_weight: float,
+                    start: Tuple[np.ndarray, np.ndarray, float]) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Frontier portfolio min 1/2 w'Qw - t mean'w whose variance w'Qw hits the target
+
+    Within one active set the solution is linear in t, w = w0 + t d, so the
+    variance is a quadratic in t that is solved exactly; the QP is re-solved
+    at that t (warm-started) until the active set stops changing. Steps are
+    safeguarded by a bracket, as the variance increases with t. A point
+    that is infeasible or misses the target is re-solved by SLSQP.
+    """
+    n = len(mean)
+    ones = np.ones(n)
+    upper = np.full(n, max_weight)
+    w, free, t = start
+    low, high = 0.0, np.inf
+
+    for _ in range(100):
+        w, free, _ = _active_set_qp(Q, t * mean, ones, 1.0, upper, w, free)
+        variance = w @ Q @ w
+        if abs(variance - target_variance) <= 1e-10 * target_variance:
+            break
+        if variance < target_variance:
+            low = t
+        else:
+            high = t
+
+        # Direction of the solution in t for the current free set
+        d = np.zeros(n)
+        F, X = np.flatnonzero(free), np.flatnonzero(~free)
+        d[F] = _free_set_solve(Q, F, X, d, mean, ones, 0.0)[0]
+        w0 = w - t * d
+
+        A, B, C = d @ Q @ d, 2 * w0 @ Q @ d, w0 @ Q @ w0 - target_variance
+        candidate = np.nan
+        if A > 1e-14:
+            candidate = (-B + np.sqrt(max(B * B - 4 * A * C, 0.0))) / (2 * A)
+        if not (low < candidate < high):
+            candidate = 2 * t + 1 if np.isinf(high) else (low + high) / 2
+        t = candidate
+
+    if not _is_feasible(w, ones, 1.0, upper) or not abs(w @ Q @ w - target_variance) <= 1e-6 * target_variance:
+        warnings.warn("Frontier point did not converge; falling back to SLSQP", RuntimeWarning)
+        w = _slsqp_frontier_point(mean, Q, target_variance, upper)
+        free = (w > 1e-12) & (w < upper - 1e-12)
+    return w, free, t
+
+def _slsqp_frontier_point(mean: np.ndarray, Q: Covariance, target_variance: float, upper: np.ndarray) -> np.ndarray:
+    """Last-resort frontier point: the highest return with w'Qw <= target by SLSQP"""
+    n = len(mean)
+    ones = np.ones(n)
+    constraints = [
+        {'type': 'eq', 'fun': lambda w: w.sum() - 1, 'jac': lambda w: ones},
+        {'type': 'ineq', 'fun': lambda w: target_variance - w @ (Q @ w), 'jac': lambda w: -2 * (Q @ w)}
+    ]
+    start = _feasible_point(ones, 1.0, upper, np.argsort(Q.diagonal()))
+    w = np.clip(_solve(lambda w: (-mean @ w, -mean), start, [(0.0, u) for u in upper], constraints), 0.0, upper)
+    if not _is_feasible(w, ones, 1.0, upper, tol=1e-6) or w @ Q @ w > target_variance * (1 + 1e-6):
+        raise ValueError("Portfolio optimization failed: no feasible frontier point found")
+    return w
+
+def target_volatility_weights(mean: np.ndarray,
+                              cov: Covariance,
+                              target_volatility: float,
+                              max_weight: float = 1.0,
+                              start: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Long-only weights with the highest expected return at a volatility target
+
+    At a fixed volatility the highest Sharpe ratio is the highest return;
+    the answer is the efficient-frontier portfolio with that volatility,
+    found by ``_frontier_point``. Targets below the minimum-variance or
+    above the maximum-return volatility give those portfolios. ``start``
+    weights seed the active sets of both solves.
+    """
+    mean = np.asarray(mean, dtype=np.float64)
+    cov = _as_covariance(cov)
+    top = max_return_weights(mean, max_weight)
+    if top @ cov @ top <= target_volatility ** 2:
+        return top
+
+    Q, scale = _normalized(cov)
+    n = len(mean)
+    if start is None:
+        w, free = _budget_start(np.argsort(Q.diagonal()), max_weight)
+    else:
+        w, free = _warm_start(start, max_weight)
+    w, free, _ = _active_set_qp(Q, np.zeros(n), np.ones(n), 1.0, np.full(n, max_weight), w, free)
+    target_variance = target_volatility ** 2 / scale
+    if w @ Q @ w >= target_variance:
+        return w
+
+    if start is not None:
+        w, free = _warm_start(start, max_weight)
+    mean_scale = np.abs(mean).max() or 1.0
+    return _frontier_point(mean / mean_scale, Q, target_variance, max_weight, (w, free, 1.0))[0]
+
+def risk_contributions(weights: np.ndarray, cov: Covariance) -> np.ndarray:
+    """
+    Share of portfolio variance contributed by each asset, w_i (Cw)_i / w'Cw
+    
+    Works on a single portfolio (n,) with an (n, n) covariance, or on
+    stacks (k, n) and (k, n, n), e.g. one per rebalance date. With a
+    ``FactorCovariance`` the portfolios (n,) or (k, n) share it.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if isinstance(cov, FactorCovariance):
+        marginal = weights @ cov
+    else:
+        marginal = np.einsum('...ij,...j->...i', np.asarray(cov, dtype=np.float64), weights)
+    contributions = weights * marginal
+    return contributions / contributions.sum(axis=-1, keepdims=True)
+
+def parametric_portfolio_var(weights: np.ndarray,
+                             cov,
+                             confidence: float = 0.95,
+                             horizon: int = 1,
+                             mean: Optional[np.ndarray] = None) -> Dict:
+    """
+    Normal (delta) VaR and ES of a portfolio, with VaR contributions
+    
+    Parameters:
+    -----------
+    weights : np.ndarray
+        Portfolio weights
+    cov : np.ndarray or FactorCovariance
+        Daily covariance; anything supporting ``cov @ w``, so a
+        low-rank plus diagonal factor covariance costs O(N K)
+    confidence : float
+        Confidence level
+    horizon : int
+        Horizon in days (square-root-of-time scaling)
+    mean : np.ndarray, optional
+        Daily expected returns (default zero)
+        
+    Returns:
+    --------
+    Dict
+        'var' and 'es' as return quantiles (negative = loss), and
+        'component_var' per asset, summing to the volatility part of 'var'
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    marginal = cov @ weights
+    volatility = np.sqrt(weights @ marginal * horizon)
+    drift = 0.0 if mean is None else float(np.asarray(mean) @ weights) * horizon
+    z = norm.ppf(1 - confidence)
+    return {
+        'var': drift + z * volatility,
+        'es': drift - volatility * norm.pdf(z) / (1 - confidence),
+        'component_var': z * weights * marginal * horizon / volatility
+    }
+
+def _positive_step(x: np.ndarray,
+                   step: np.ndarray,
+                   decrement: np.ndarray,
+                   objective: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """
+    Lengths t (one per row) of the Newton updates x - t * step
+
+    A step goes at most 99% of the way to the boundary x = 0, and is halved
+    until it decreases the objective enough (Armijo). Close to the optimum
+    (decrement below 1/4) the full step is taken, for quadratic convergence.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        room = np.where(step > 0, x / step, np.inf).min(axis=1)
+    t = np.minimum(1.0, 0.99 * room)
+    current = objective(x)
+    for _ in range(60):
+        trial = objective(x - t[:, None] * step)
+        worse = (trial > current - 0.25 * t * decrement ** 2) & (decrement > 0.25)
+        if not worse.any():
+            break
+        t[worse] /= 2
+    return t
+
+def _factor_risk_budget(cov: FactorCovariance,
+                        budgets: np.ndarray,
+                        tol: float,
+                        max_iter: int) -> np.ndarray:
+    """``risk_budget_weights`` for one factor covariance: Newton steps by Woodbury solves"""
+    Q, _ = _normalized(cov)
+    x = budgets / np.sqrt(Q.diagonal())
+    x *= np.sqrt(1 / (x @ Q @ x))
+    objective = lambda z: 0.5 * np.einsum('ki,ki->k', z, z @ Q) - np.log(z) @ budgets
+    for _ in range(max_iter):
+        gradient = Q @ x - budgets / x
+        step = Q.solve(gradient, extra_diagonal=budgets / x ** 2)
+        decrement = np.sqrt(max(gradient @ step, 0.0))
+        x = x - _positive_step(x[None], step[None], np.array([decrement]), objective)[0] * step
+        if decrement ** 2 / 2 <= tol:
+            break
+    else:
+        print("Warning: risk budgeting did not converge")
+    return x / x.sum()
+
+def risk_budget_weights(cov: Covariance,
+                        budgets: Optional[np.ndarray] = None,
+                        tol: float = 1e-12,
+                        max_iter: int = 100) -> np.ndarray:
+    """
+    Long-only weights whose risk contributions match a budget
+    
+    Parameters:
+    -----------
+    cov : np.ndarray or FactorCovariance
+        Covariance (n, n), or a stack (k, n, n) solved together
+    budgets : np.ndarray, optional
+        Positive risk budgets (n,) or (k, n); normalized to sum to one
+        (default: equal budgets, i.e. risk parity)
+    tol : float
+        Stopping tolerance on the Newton decrement
+    max_iter : int
+        Maximum Newton iterations
+        
+    Returns:
+    --------
+    np.ndarray
+        Weights (n,) or (k, n)
+        
+    Minimizes the convex function 1/2 x'Cx - sum(b log x), whose minimizer
+    has x_i (Cx)_i = b_i, and sets w = x / sum(x). The equations also have
+    roots with negative x, so Newton steps are kept inside x > 0 and
+    backtracked until the objective decreases (``_positive_step``); they
+    converge quadratically near the optimum. All matrices take their
+    Newton steps as one batched solve.
+    """
+    if isinstance(cov, FactorCovariance):
+        budgets = np.full(cov.shape[0], 1.0) if budgets is None else np.asarray(budgets, dtype=np.float64)
+        if (budgets <= 0).any():
+            raise ValueError("Risk budgets must be positive")
+        return _factor_risk_budget(cov, budgets / budgets.sum(), tol, max_iter)
+        
+    cov = np.asarray(cov, dtype=np.float64)
+    single = cov.ndim == 2
+    if single:
+        cov = cov[None]
+    k, n, _ = cov.shape
+    
+    if budgets is None:
+        budgets = np.full(n, 1.0 / n)
+    budgets = np.broadcast_to(np.asarray(budgets, dtype=np.float64), (k, n))
+    if (budgets <= 0).any():
+        raise ValueError("Risk budgets must be positive")
+    budgets = budgets / budgets.sum(axis=1, keepdims=True)
+    
+    # Unit average variance per matrix, so one tolerance fits all
+    Q = cov / np.einsum('kii->k', cov)[:, None, None] * n
+    diagonal = np.einsum('kii->ki', Q)
+    x = budgets / np.sqrt(diagonal)
+    x *= np.sqrt(1 / np.einsum('ki,kij,kj->k', x, Q, x))[:, None]
+    
+    active = np.ones(k, dtype=bool)
+    for _ in range(max_iter):
+        q, xa, ba = Q[active], x[active], budgets[active]
+        gradient = np.einsum('kij,kj->ki', q, xa) - ba / xa
+        hessian = q + np.einsum('ki,ij->kij', ba / xa ** 2, np.eye(n))
+        step = np.linalg.solve(hessian, gradient[..., None])[..., 0]
+        decrement = np.sqrt(np.maximum((gradient * step).sum(axis=1), 0.0))
+        
+        objective = lambda z: (0.5 * np.einsum('ki,kij,kj->k', z, q, z)
+                               - np.einsum('ki,ki->k', ba, np.log(z)))
+        x[active] = xa - _positive_step(xa, step, decrement, objective)[:, None] * step
+        done = decrement ** 2 / 2 <= tol
+        active[np.flatnonzero(active)[done]] = False
+        if not active.any():
+            break
+    else:
+        print(f"Warning: risk budgeting did not converge for {active.sum()} covariance matrices")
+        
+    weights = x / x.sum(axis=1, keepdims=True)
+    return weights[0] if single else weights
+
+@dataclass
+class EfficientFrontier:
+    weights: np.ndarray       # Frontier portfolios, points x assets
+    returns: np.ndarray       # Expected return per point
+    volatilities: np.ndarray  # Volatility per point
+    sharpe: np.ndarray        # Sharpe ratio per point
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return, volatility and Sharpe ratio per point"""
+        return pd.DataFrame({
+            'return': self.returns,
+            'volatility': self.volatilities,
+            'sharpe': self.sharpe
+        })
+
+def _frontier_segment(mean: np.ndarray,
+                      Q: Covariance,
+                      target_variances: np.ndarray,
+                      max_weight: float,
+                      start: Tuple[np.ndarray, np.ndarray, float]) -> np.ndarray:
+    """Frontier portfolios for ascending targets, each warm-started from the previous one"""
+    weights = np.empty((len(target_variances), len(mean)))
+    state = start
+    for i, target_variance in enumerate(target_variances):
+        state = _frontier_point(mean, Q, target_variance, max_weight, state)
+        weights[i] = state[0]
+    return weights
+
+def efficient_frontier(mean: np.ndarray,
+                       cov: Covariance,
+                       points: int = 50,
+                       risk_free_rate: float = 0.0,
+                       max_weight: float = 1.0,
+                       max_workers: Optional[int] = None,
+                       pool: Optional[ProcessPoolExecutor] = None) -> EfficientFrontier:
+    """
+    Long-only efficient frontier at evenly spaced volatilities
+    
+    Parameters:
+    -----------
+    mean : np.ndarray
+        Expected returns
+    cov : np.ndarray or FactorCovariance
+        Covariance matrix
+    points : int
+        Number of frontier points, from the minimum-variance to the
+        maximum-return portfolio
+    risk_free_rate : float
+        Risk-free rate of the Sharpe ratios
+    max_weight : float
+        Cap per asset
+    max_workers : int, optional
+        Split the points into this many contiguous segments solved on a
+        process pool (default: a single sequential pass)
+    pool : ProcessPoolExecutor, optional
+        Long-lived pool for the segments, e.g. kept by the caller across
+        Streamlit reruns (default: a spawned pool for this call only)
+        
+    Returns:
+    --------
+    EfficientFrontier
+        Weights, returns, volatilities and Sharpe ratios as arrays
+        
+    Every point is warm-started from its neighbour's solution, active set
+    and risk-aversion parameter, so moving along the frontier usually
+    takes one or two KKT solves per point.
+    """
+    mean = np.asarray(mean, dtype=np.float64)
+    cov = _as_covariance(cov)
+    Q, scale = _normalized(cov)
+    n = len(mean)
+    mean_scale = np.abs(mean).max() or 1.0
+    
+    w, free = _budget_start(np.argsort(Q.diagonal()), max_weight)
+    w, free, _ = _active_set_qp(Q, np.zeros(n), np.ones(n), 1.0, np.full(n, max_weight), w, free)
+    top = max_return_weights(mean, max_weight)
+    
+    targets = np.linspace(np.sqrt(w @ cov @ w), np.sqrt(top @ cov @ top), points)
+    weights = np.empty((points, n))
+    weights[0] = w
+    if points > 1:
+        weights[-1] = top
+    interior = targets[1:-1] ** 2 / scale
+    start = (w, free, 1.0)
+    
+    if len(interior) and max_workers and max_workers > 1:
+        segments = [segment for segment in np.array_split(interior, max_workers) if len(segment)]
+        # Spawned, not forked: callers such as Streamlit run this from a thread
+        owned = pool is None
+        if owned:
+            pool = ProcessPoolExecutor(max_workers=len(segments), mp_context=multiprocessing.get_context('spawn'))
+        try:
+            parts = pool.map(_frontier_segment, repeat(mean / mean_scale), repeat(Q),
+                             segments, repeat(max_weight), repeat(start))
+            weights[1:-1] = np.vstack(list(parts))
+        finally:
+            if owned:
+                pool.shutdown()
+    elif len(interior):
+        weights[1:-1] = _frontier_segment(mean / mean_scale, Q, interior, max_weight, start)
+        
+    returns = weights @ mean
+    volatilities = np.sqrt(np.einsum('ij,ij->i', weights, weights @ cov))
+    return EfficientFrontier(
+        weights=weights,
+        returns=returns,
+        volatilities=volatilities,
+        sharpe=(returns - risk_free_rate) / volatilities
+    )
 
 class PortfolioOptimizer:
-    def __init__(self, returns: pd.DataFrame, risk_free_rate: float = 0.02):
+    def __init__(self,
+                 returns: pd.DataFrame,
+                 risk_free_rate: float = 0.02,
+                 covariance: Optional[EWMACovariance] = None,
+                 estimator: Union[str, Callable] = 'sample'):
+        """
+        Mean-variance portfolio optimizer
+        
+        ``covariance`` supplies an online (EWMA) covariance estimate that
+        is kept current with ``update``. Without it the covariance comes
+        from ``estimator``: a name in ``portfolio.covariance.ESTIMATORS``
+        ('sample', 'ledoit_wolf', 'pca') or a function of the returns.
+        Its estimate is cached per estimator and content of the returns
+        (``cached_estimate``), so optimizers rebuilt over the same data
+        share it and changed returns are never served a stale one; a
+        'pca' factor model is kept in low-rank form, so the solvers work
+        in O(N K) memory.
+        """
         self.returns = returns
         self.risk_free_rate = risk_free_rate
+        self.covariance = covariance
+        self.estimator = ESTIMATORS[estimator] if isinstance(estimator, str) else estimator
+        self._estimate = None  # (data version, annualized estimate)
+        
+    @property
+    def returns(self) -> pd.DataFrame:
+        return self._returns
+        
+    @returns.setter
+    def returns(self, returns: pd.DataFrame):
+        # Fingerprinted on first use; hashing on every solve would cost O(T N)
+        self._returns = returns
+        self._version = None
+        
+    def update(self, new_returns: pd.DataFrame):
+        """Append new bars of returns, updating the covariance in O(N^2) per bar"""
+        self.returns = pd.concat([self.returns, new_returns])
+        if self.covariance is not None:
+            self.covariance.update_batch(new_returns)
+            
+    def covariance_model(self) -> Covariance:
+        """Annualized covariance used by the solvers: an array or a ``FactorCovariance``"""
+        if self.covariance is not None:
+            return self.covariance_matrix().to_numpy()
+        if self._version is None:
+            self._version = data_version(self.returns)
+        version = self._version
+        if self._estimate is None or self._estimate[0] != version:
+            self._estimate = (version, cached_estimate(self.returns, self.estimator, version) * 252)
+        return self._estimate[1]
+            
+    def covariance_matrix(self) -> pd.DataFrame:
+        """Annualized covariance used by the optimizer, as a full matrix"""
+        if self.covariance is not None:
+            return self.covariance.covariance(annualize=True).loc[self.returns.columns, self.returns.columns]
+        estimate = self.covariance_model()
+        if isinstance(estimate, FactorCovariance):
+            estimate = estimate.to_dense()
+        return pd.DataFrame(estimate, index=self.returns.columns, columns=self.returns.columns)
         
     def calculate_optimal_weights(self, 
                                 target_volatility: float,
                                 constraints: Optional[Dict] = None) -> np.array:
-        """Calculate optimal portfolio weights using mean-variance optimization"""
-        n_assets = len(self.returns.columns)
+        """Calculate optimal portfolio weights using mean-variance optimization
         
-        # Calculate mean returns and covariance
-        mean_returns = self.returns.mean() * 252  # Annualized
-        cov_matrix = self.returns.cov() * 252
+        Maximum Sharpe ratio weights, or with ``target_volatility`` the
+        highest-return weights at that volatility; ``constraints`` may set
+        a 'max_weight' per asset (default 1, long-only).
+        """
+        mean_returns = self.returns.mean().to_numpy() * 252  # Annualized
+        cov_matrix = self.covariance_model()
+        max_weight = (constraints or {}).get('max_weight', 1.0)
         
-        def portfolio_volatility(weights):
-            return np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
+        if target_volatility:
+            return target_volatility_weights(mean_returns, cov_matrix, target_volatility, max_weight)
+        return max_sharpe_weights(mean_returns, cov_matrix, self.risk_free_rate, max_weight)
         
-        def portfolio_return(weights):
-            return np.sum(mean_returns * weights)
+    def calculate_minimum_variance_weights(self, max_weight: float = 1.0) -> np.array:
+        """Calculate long-only minimum-variance weights"""
+        return min_variance_weights(self.covariance_model(), max_weight)
         
-        # Optimization constraints
-        constraints = []
-        constraints.append({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})  # Weights sum to 1
+    def calculate_minimum_volatility(self) -> float:
+        """Calculate volatility of the minimum-variance portfolio"""
+        cov_matrix = self.covariance_model()
+        weights = min_variance_weights(cov_matrix)
+        return float(np.sqrt(weights @ cov_matrix @ weights))
         
-        if target_volatility:
-            constraints.append({
-                'type': 'eq',
-                'fun': lambda x: portfolio_volatility(x) - target_volatility
-            })
-            
-        # Bounds for weights (0 to 1)
-        bounds = tuple((0, 1) for _ in range(n_assets))
-        
-        # Objective function (Sharpe Ratio)
-        def objective(weights):
-            ret = portfolio_return(weights)
-            vol = portfolio_volatility(weights)
-            return -(ret - self.risk_free_rate) / vol
-            
-        # Optimize
-        result = minimize(
-            objective,
-            n_assets * [1./n_assets],
-            method='SLSQP',
-            bounds=bounds,
-            constraints=constraints
+    def calculate_maximum_return(self) -> Dict:
+        """Calculate return, volatility and weights of the maximum-return portfolio"""
+        mean_returns = self.returns.mean().to_numpy() * 252
+        cov_matrix = self.covariance_model()
+        weights = max_return_weights(mean_returns)
+        return {
+            'return': float(mean_returns @ weights),
+            'volatility': float(np.sqrt(weights @ cov_matrix @ weights)),
+            'weights': weights
+        }
+        
+    def calculate_risk_budget_weights(self, budgets: Optional[np.ndarray] = None) -> np.array:
+        """Calculate risk-budget weights (equal budgets: risk parity)"""
+        return risk_budget_weights(self.covariance_model(), budgets)
+        
+    def calculate_risk_contributions(self, weights: np.ndarray) -> pd.Series:
+        """Calculate each asset's share of portfolio variance"""
+        return pd.Series(
+            risk_contributions(weights, self.covariance_model()),
+            index=self.returns.columns
         )
         
-        return result.x
+    def calculate_portfolio_var(self, weights: np.ndarray, confidence: float = 0.95, horizon: int = 1) -> Dict:
+        """Calculate normal VaR/ES of the weights from the optimizer's covariance"""
+        return parametric_portfolio_var(weights, self.covariance_model() / 252, confidence, horizon,
+                                        self.returns.mean().to_numpy())
+        
+    def efficient_frontier(self,
+                           points: int = 50,
+                           max_workers: Optional[int] = None,
+                           pool: Optional[ProcessPoolExecutor] = None) -> EfficientFrontier:
+        """Calculate efficient frontier weights, returns and volatilities as arrays"""
+        return efficient_frontier(
+            self.returns.mean().to_numpy() * 252,
+            self.covariance_model(),
+            points=points,
+            risk_free_rate=self.risk_free_rate,
+            max_workers=max_workers,
+            pool=pool
+        )
         
     def calculate_efficient_frontier(self, 
-                                   points: int = 50) -> pd.DataFrame:
+                                   points: int = 50,
+                                   max_workers: Optional[int] = None,
+                                   pool: Optional[ProcessPoolExecutor] = None) -> pd.DataFrame:
         """Calculate efficient frontier points"""
-        min_vol = self.calculate_minimum_volatility()
-        max_ret = self.calculate_maximum_return()
-        
-        target_vols = np.linspace(min_vol, max_ret['volatility'], points)
-        efficient_points = []
-        
-        for target_vol in target_vols:
-            weights = self.calculate_optimal_weights(target_vol)
-            ret = np.sum(self.returns.mean() * 252 * weights)
-            efficient_points.append({
-                'return': ret,
-                'volatility': target_vol,
-                'sharpe': (ret - self.risk_free_rate) / target_vol
-            })
-            
-        return pd.DataFrame(efficient_points)
\ No newline at end of file
+        return self.efficient_frontier(points, max_workers, pool).to_frame()
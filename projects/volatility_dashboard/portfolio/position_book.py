@@ -0,0 +1,208 @@
+# portfolio/position_book.py
+
+import numpy as np
+import pandas as pd
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from analysis.regime import VolatilityRegime
+
+REGIMES = tuple(regime.value for regime in VolatilityRegime)
+
+@dataclass
+class PositionInfo:
+    symbol: str
+    size: float
+    stop_loss: float
+    take_profit: Optional[float]
+    risk_amount: float
+    position_volatility: float
+    entry_price: Optional[float] = None
+    regime: Optional[str] = None  # One of REGIMES
+
+class PositionBook(Mapping):
+    # Float columns, one array each; ``regime`` is stored as a code into REGIMES (-1 = unknown)
+    COLUMNS = ('size', 'entry_price', 'stop_loss', 'take_profit', 'risk_amount', 'position_volatility')
+
+    def __init__(self, capacity: int = 64):
+        """
+        Open positions stored column-wise, with running aggregates
+
+        Parameters:
+        -----------
+        capacity : int
+            Initial rows allocated; storage doubles when full
+
+        Each field is a NumPy array with one row per position, and a
+        symbol -> row index finds a position. Totals (risk, exposure, risk
+        per regime) are adjusted by the change of every update, so reading
+        them costs O(1) whatever the size of the book. Reads as a mapping
+        of symbol -> PositionInfo.
+        """
+        self.symbols: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self._columns = {name: np.zeros(capacity) for name in self.COLUMNS}
+        self._regime = np.full(capacity, -1, dtype=np.int8)
+
+        self.total_risk = 0.0
+        self.gross_exposure = 0.0
+        self._regime_risk = np.zeros(len(REGIMES) + 1)  # Last slot: unknown regime
+        self._highest_vol: Optional[str] = None
+        self._highest_vol_stale = False
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __iter__(self):
+        return iter(list(self.symbols))
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self.rows
+
+    def __getitem__(self, symbol: str) -> PositionInfo:
+        row = self.rows[symbol]
+        values = {name: float(self._columns[name][row]) for name in self.COLUMNS}
+        for name in ('entry_price', 'take_profit'):
+            if np.isnan(values[name]):
+                values[name] = None
+        code = self._regime[row]
+        return PositionInfo(symbol=symbol, regime=REGIMES[code] if code >= 0 else None, **values)
+
+    def column(self, name: str) -> np.ndarray:
+        """View of one field over all positions, in row order"""
+        if name == 'regime':
+            return self._regime[:len(self)]
+        return self._columns[name][:len(self)]
+
+    def _grow(self, needed: int):
+        capacity = len(self._regime)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, values in self._columns.items():
+            self._columns[name] = np.concatenate([values, np.zeros(capacity - len(values))])
+        self._regime = np.concatenate([self._regime, np.full(capacity - len(self._regime), -1, dtype=np.int8)])
+
+    def _aggregate(self, rows: np.ndarray, sign: float):
+        """Add (sign=1) or remove (sign=-1) rows' contributions to the running totals"""
+        risk = self._columns['risk_amount'][rows]
+        exposure = np.abs(self._columns['size'][rows] * self._columns['entry_price'][rows])
+        self.total_risk += sign * risk.sum()
+        self.gross_exposure += sign * np.nansum(exposure)
+        # Code -1 (unknown) lands in the last slot
+        np.add.at(self._regime_risk, self._regime[rows], sign * risk)
+
+    def update(self,
+               symbols: Sequence[str],
+               size: np.ndarray,
+               stop_loss: np.ndarray,
+               risk_amount: np.ndarray,
+               position_volatility: np.ndarray,
+               entry_price: Optional[np.ndarray] = None,
+               take_profit: Optional[np.ndarray] = None,
+               regime: Optional[Sequence[Optional[str]]] = None):
+        """
+        Add or replace many positions at once
+
+        Arrays are aligned with ``symbols`` (which must be unique); a
+        missing ``entry_price`` or ``take_profit`` is NaN, a missing
+        ``regime`` unknown. Size, risk amount and volatility must be
+        finite, as the running totals could never shed a NaN. Only the
+        symbol lookup is a Python loop.
+        """
+        symbols = list(symbols)
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("Duplicate symbols in position update")
+        n = len(symbols)
+        required = {
+            'size': np.broadcast_to(np.asarray(size, dtype=np.float64), n),
+            'risk_amount': np.broadcast_to(np.asarray(risk_amount, dtype=np.float64), n),
+            'position_volatility': np.broadcast_to(np.asarray(position_volatility, dtype=np.float64), n)
+        }
+        for name, value in required.items():
+            invalid = ~np.isfinite(value)
+            if invalid.any():
+                bad = [symbols[i] for i in np.flatnonzero(invalid)[:5]]
+                raise ValueError(f"Non-finite {name} for {', '.join(bad)}")
+
+        rows = np.fromiter((self.rows.get(symbol, -1) for symbol in symbols), dtype=np.int64, count=n)
+        new = rows < 0
+        if new.any():
+            start = len(self.symbols)
+            self._grow(start + new.sum())
+            rows[new] = np.arange(start, start + new.sum())
+            for symbol, row in zip(np.asarray(symbols, dtype=object)[new], rows[new]):
+                self.rows[symbol] = int(row)
+                self.symbols.append(symbol)
+            # Fresh rows contribute nothing until written
+            for values in self._columns.values():
+                values[rows[new]] = 0.0
+            self._regime[rows[new]] = -1
+
+        self._aggregate(rows, -1.0)
+        values = {
+            **required,
+            'entry_price': np.nan if entry_price is None else entry_price,
+            'stop_loss': stop_loss,
+            'take_profit': np.nan if take_profit is None else take_profit
+        }
+        for name, value in values.items():
+            self._columns[name][rows] = np.asarray(value, dtype=np.float64)
+        if regime is None:
+            self._regime[rows] = -1
+        else:
+            codes = {name: code for code, name in enumerate(REGIMES)}
+            self._regime[rows] = [codes.get(name, -1) for name in regime]
+        self._aggregate(rows, 1.0)
+        self._highest_vol_stale = True
+
+    def add(self, position: PositionInfo):
+        """Add or replace one position (a PositionInfo)"""
+        self.update(
+            [position.symbol],
+            size=[position.size],
+            stop_loss=[position.stop_loss],
+            risk_amount=[position.risk_amount],
+            position_volatility=[position.position_volatility],
+            entry_price=[np.nan if position.entry_price is None else position.entry_price],
+            take_profit=[np.nan if position.take_profit is None else position.take_profit],
+            regime=[position.regime]
+        )
+
+    def remove(self, symbol: str):
+        """Close a position; the last row moves into its place"""
+        row = self.rows.pop(symbol)
+        self._aggregate(np.array([row]), -1.0)
+        last = len(self.symbols) - 1
+        if row != last:
+            moved = self.symbols[last]
+            for values in self._columns.values():
+                values[row] = values[last]
+            self._regime[row] = self._regime[last]
+            self.symbols[row] = moved
+            self.rows[moved] = row
+        self.symbols.pop()
+        if not self.symbols:
+            # Clear accumulated rounding
+            self.total_risk = self.gross_exposure = 0.0
+            self._regime_risk[:] = 0.0
+        self._highest_vol_stale = True
+
+    def regime_risk(self) -> Dict[str, float]:
+        """Risk amount per regime ('Unknown' for positions without one)"""
+        return dict(zip(REGIMES + ('Unknown',), self._regime_risk.tolist()))
+
+    def highest_volatility_symbol(self) -> Optional[str]:
+        """Symbol of the most volatile position (rescanned only after a change)"""
+        if self._highest_vol_stale:
+            vol = self.column('position_volatility')
+            self._highest_vol = self.symbols[int(np.argmax(vol))] if len(vol) else None
+            self._highest_vol_stale = False
+        return self._highest_vol
+
+    def to_frame(self) -> pd.DataFrame:
+        """Positions as a DataFrame indexed by symbol"""
+        frame = pd.DataFrame({name: self.column(name) for name in self.COLUMNS}, index=list(self.symbols))
+        frame['regime'] = [REGIMES[code] if code >= 0 else None for code in self.column('regime')]
+        return frame
@@ -2,17 +2,19 @@
 
 import pandas as pd
 import numpy as np
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence, Union
 
-@dataclass
-class PositionInfo:
-    symbol: str
-    size: float
-    stop_loss: float
-    take_profit: Optional[float]
-    risk_amount: float
-    position_volatility: float
+from analysis.regime import VolatilityRegime
+from portfolio.position_book import PositionBook, PositionInfo
+
+# Position size multiplier per volatility regime
+REGIME_MULTIPLIERS = {
+    VolatilityRegime.LOW.value: 1.2,
+    VolatilityRegime.NORMAL.value: 1.0,
+    VolatilityRegime.HIGH.value: 0.5,
+    VolatilityRegime.EXTREME.value: 0.25
+}
 
 class PortfolioRiskManager:
     def __init__(self, 
@@ -22,7 +24,7 @@ class PortfolioRiskManager:
         self.portfolio_value = portfolio_value
         self.max_position_risk = max_position_risk
         self.max_portfolio_risk = max_portfolio_risk
-        self.positions: Dict[str, PositionInfo] = {}
+        self.positions = PositionBook()
         
     def calculate_position_size(self, 
                               symbol: str,
@@ -34,18 +36,20 @@ class PortfolioRiskManager:
         stop_distance = volatility * stop_distance_atr
         stop_loss = current_price * (1 - stop_distance)
         
-        # Calculate risk amount
-        risk_amount = self.portfolio_value * self.max_position_risk
+        # Adjust for volatility regime
+        if volatility > 0.4:  # High volatility regime
+            regime = VolatilityRegime.HIGH
+        elif volatility < 0.15:  # Low volatility regime
+            regime = VolatilityRegime.LOW
+        else:
+            regime = VolatilityRegime.NORMAL
+        
+        # Calculate risk amount, as actually put at risk after the regime adjustment
+        risk_amount = self.portfolio_value * self.max_position_risk * REGIME_MULTIPLIERS[regime.value]
         
         # Calculate position size
         price_risk = current_price - stop_loss
         position_size = risk_amount / price_risk
-        
-        # Adjust for volatility regime
-        if volatility > 0.4:  # High volatility regime
-            position_size *= 0.5
-        elif volatility < 0.15:  # Low volatility regime
-            position_size *= 1.2
             
         return PositionInfo(
             symbol=symbol,
@@ -53,28 +57,138 @@ class PortfolioRiskManager:
             stop_loss=stop_loss,
             take_profit=current_price * (1 + stop_distance * 2),  # 2:1 reward-risk
             risk_amount=risk_amount,
-            position_volatility=volatility
+            position_volatility=volatility,
+            entry_price=current_price,
+            regime=regime.value
         )
     
+    def calculate_position_sizes(self,
+                                 prices: np.ndarray,
+                                 volatilities: np.ndarray,
+                                 regimes: Optional[Sequence[str]] = None,
+                                 stop_distance_atr: Union[float, np.ndarray] = 2.0,
+                                 symbols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Position sizes for a whole universe in one pass
+        
+        Parameters:
+        -----------
+        prices : np.ndarray
+            Current prices
+        volatilities : np.ndarray
+            Volatilities, in the units of ``calculate_position_size``
+        regimes : Sequence[str], optional
+            Volatility regime per symbol, each a key of REGIME_MULTIPLIERS;
+            by default derived from the volatility as in
+            ``calculate_position_size``
+        stop_distance_atr : float or np.ndarray
+            Stop distance in volatilities, per symbol or for all
+        symbols : Sequence[str], optional
+            Symbols of the rows. Their positions in the book are taken as
+            replaced, and only the risk of the book's other positions
+            counts against ``max_portfolio_risk``; without symbols the
+            book is ignored.
+            
+        Returns:
+        --------
+        pd.DataFrame
+            One row per input (indexed by ``symbols`` if given) with the
+            columns of ``update_positions``: 'size', 'entry_price',
+            'stop_loss', 'take_profit', 'risk_amount' (after all scaling),
+            'position_volatility' and 'regime'. Size and risk are 0 where
+            the price or volatility is unusable; drop those rows before
+            ``update_positions``.
+            
+        Each position risks ``max_position_risk`` of the portfolio, scaled
+        by its regime multiplier (REGIME_MULTIPLIERS). If the positions
+        together would risk more than the ``max_portfolio_risk`` budget
+        left, all sizes are scaled down by the same factor. Regimes not in
+        REGIME_MULTIPLIERS raise a ValueError.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        volatilities = np.asarray(volatilities, dtype=np.float64)
+        
+        if regimes is None:
+            regimes = np.where(
+                volatilities > 0.4, VolatilityRegime.HIGH.value,
+                np.where(volatilities < 0.15, VolatilityRegime.LOW.value, VolatilityRegime.NORMAL.value)
+            )
+        regimes = pd.Series(regimes, dtype=object)
+        multipliers = regimes.map(REGIME_MULTIPLIERS)
+        unknown = multipliers.isna()
+        if unknown.any():
+            raise ValueError(f"Unknown volatility regimes {sorted(set(map(str, regimes[unknown])))}, "
+                             f"expected one of {list(REGIME_MULTIPLIERS)}")
+        multipliers = multipliers.to_numpy(dtype=np.float64)
+            
+        stop_distance = volatilities * stop_distance_atr
+        price_risk = prices * stop_distance
+        valid = np.isfinite(price_risk) & (price_risk > 0)
+        position_risk = np.where(valid, self.portfolio_value * self.max_position_risk * multipliers, 0.0)
+        sizes = np.divide(position_risk, price_risk, out=np.zeros_like(price_risk), where=valid)
+        
+        # Joint cap on the risk of these and the book's other positions
+        other_risk = 0.0
+        if symbols is not None:
+            rows = self.positions.rows
+            held = np.fromiter((rows.get(symbol, -1) for symbol in symbols), dtype=np.int64, count=len(prices))
+            replaced = self.positions.column('risk_amount')[held[held >= 0]].sum()
+            other_risk = self.positions.total_risk - replaced
+        available = max(self.portfolio_value * self.max_portfolio_risk - other_risk, 0.0)
+        total_risk = position_risk.sum()
+        if total_risk > available:
+            sizes *= available / total_risk
+            position_risk *= available / total_risk
+            
+        return pd.DataFrame({
+            'size': sizes,
+            'entry_price': prices,
+            'stop_loss': prices * (1 - stop_distance),
+            'take_profit': prices * (1 + stop_distance * 2),  # 2:1 reward-risk
+            'risk_amount': position_risk,
+            'position_volatility': volatilities,
+            'regime': regimes.to_numpy()
+        }, index=pd.Index(symbols) if symbols is not None else None)
+        
     def update_position(self, symbol: str, position_info: PositionInfo):
         """Update or add new position"""
-        self.positions[symbol] = position_info
+        self.positions.add(replace(position_info, symbol=symbol))
+        
+    def update_positions(self, positions: pd.DataFrame):
+        """
+        Update or add many positions at once
+        
+        ``positions`` is indexed by symbol with a column per
+        ``PositionBook.COLUMNS`` field ('entry_price', 'take_profit' and
+        'regime' are optional).
+        """
+        optional = {name: positions[name].to_numpy() for name in ('entry_price', 'take_profit', 'regime')
+                    if name in positions}
+        self.positions.update(
+            positions.index,
+            size=positions['size'].to_numpy(),
+            stop_loss=positions['stop_loss'].to_numpy(),
+            risk_amount=positions['risk_amount'].to_numpy(),
+            position_volatility=positions['position_volatility'].to_numpy(),
+            **optional
+        )
+        
+    def close_position(self, symbol: str):
+        """Remove a position"""
+        self.positions.remove(symbol)
         
     def calculate_portfolio_risk(self) -> float:
         """Calculate total portfolio risk"""
-        total_risk = sum(pos.risk_amount for pos in self.positions.values())
-        return total_risk / self.portfolio_value
+        return self.positions.total_risk / self.portfolio_value
     
     def get_portfolio_metrics(self) -> Dict:
         """Get current portfolio metrics"""
         return {
             'total_positions': len(self.positions),
             'portfolio_risk': self.calculate_portfolio_risk(),
-            'highest_vol_position': max(
-                self.positions.items(),
-                key=lambda x: x[1].position_volatility,
-                default=(None, None)
-            )[0],
-            'total_risk_amount': sum(pos.risk_amount for pos in self.positions.values())
+            'highest_vol_position': self.positions.highest_volatility_symbol(),
+            'total_risk_amount': self.positions.total_risk,
+            'gross_exposure': self.positions.gross_exposure,
+            'risk_by_regime': self.positions.regime_risk()
         }
 
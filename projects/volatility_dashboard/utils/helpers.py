@@ -1,41 +1,83 @@
 # utils/helpers.py (continued)
-from typing import Union, List, Dict
+from typing import Union, List, Dict, Optional, Sequence
 import pandas as pd
 import numpy as np
 
+from utils.rolling import RollingStatsEngine, VaRBreachMonitor, rolling_engine
+
+def calculate_drawdowns(returns: pd.Series) -> pd.Series:
+    """Calculate drawdowns of cumulative returns from their running peak"""
+    cumulative = (1 + returns).cumprod()
+    running_max = cumulative.cummax()
+    return cumulative / running_max - 1
+
 def calculate_rolling_metrics(returns: pd.Series, 
-                            window: int = 252) -> pd.DataFrame:
+                            window: int = 252,
+                            engine: Optional[RollingStatsEngine] = None) -> pd.DataFrame:
     """Calculate rolling performance metrics"""
     rolling_metrics = pd.DataFrame(index=returns.index)
     
+    # Rolling mean, volatility and max drawdown from the engine, shared with other
+    # callers; all three skip missing observations the same way
+    stats = (engine or rolling_engine).compute(returns.to_frame(), [window],
+                                               ('mean', 'std', 'max_drawdown'))[window]
+    
     # Rolling returns
-    rolling_metrics['returns'] = returns.rolling(window=window).mean() * 252
+    rolling_metrics['returns'] = stats['mean'].iloc[:, 0] * 252
     
     # Rolling volatility
-    rolling_metrics['volatility'] = returns.rolling(window=window).std() * np.sqrt(252)
+    rolling_metrics['volatility'] = stats['std'].iloc[:, 0] * np.sqrt(252)
     
     # Rolling Sharpe Ratio
     rolling_metrics['sharpe'] = (rolling_metrics['returns'] / rolling_metrics['volatility'])
     
-    # Rolling max drawdown
-    rolling_metrics['max_drawdown'] = returns.rolling(window=window).apply(
-        lambda x: calculate_drawdowns(x).min()
-    )
+    # Rolling max drawdown (linear time, see rolling_max_drawdown)
+    rolling_metrics['max_drawdown'] = stats['max_drawdown'].iloc[:, 0]
     
     return rolling_metrics
 
 def calculate_var_breaches(returns: pd.Series, 
-                          var_percentile: float = 0.95,
+                          var_percentile: Union[float, Sequence[float]] = 0.95,
                           window: int = 252) -> pd.DataFrame:
-    """Calculate VaR breaches"""
-    rolling_var = returns.rolling(window=window).quantile(1 - var_percentile)
-    breaches = returns < rolling_var
-    
-    return pd.DataFrame({
-        'VaR': rolling_var,
-        'Breach': breaches,
-        'Cumulative_Breaches': breaches.cumsum()
-    })
+    """Calculate VaR breaches
+    
+    Several percentiles (e.g. ``[0.95, 0.99, 0.995]``) may be given; the
+    result then has one column group per percentile, so ``result[0.99]``
+    is the frame that a single-percentile call returns. For bar-by-bar
+    updates after the batch, see ``var_breach_monitor``.
+    """
+    percentiles = [var_percentile] if np.isscalar(var_percentile) else list(var_percentile)
+    rolling = returns.astype(np.float64).rolling(window=window)
+    
+    frames = {}
+    for percentile in percentiles:
+        var = rolling.quantile(1 - percentile)
+        breach = returns < var
+        frames[percentile] = pd.DataFrame({
+            'VaR': var,
+            'Breach': breach,
+            'Cumulative_Breaches': breach.cumsum()
+        })
+    
+    if np.isscalar(var_percentile):
+        return frames[var_percentile]
+    return pd.concat(frames, axis=1)
+
+def var_breach_monitor(returns: pd.Series,
+                       var_percentile: Union[float, Sequence[float]] = 0.95,
+                       window: int = 252) -> VaRBreachMonitor:
+    """Streaming VaR breach monitor continuing from the end of ``returns``
+    
+    The monitor holds the last ``window`` returns and the breach counts of
+    ``calculate_var_breaches``, so each new bar is one ``update``.
+    """
+    percentiles = [var_percentile] if np.isscalar(var_percentile) else list(var_percentile)
+    breaches = calculate_var_breaches(returns, percentiles, window)
+    monitor = VaRBreachMonitor(window, percentiles)
+    monitor.seed(returns.to_numpy(dtype=np.float64),
+                 {p: int(breaches[p]['Cumulative_Breaches'].iloc[-1]) if len(returns) else 0
+                  for p in percentiles})
+    return monitor
 
 def format_currency(value: float) -> str:
     """Format value as currency"""
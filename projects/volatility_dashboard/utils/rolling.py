@@ -0,0 +1,349 @@
+# utils/rolling.py
+
+import bisect
+import hashlib
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+def data_version(frame: pd.DataFrame) -> str:
+    """Fingerprint of a frame's index, columns and values"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(tuple(frame.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def pack_panel(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Move each column's valid observations to the top of the column
+
+    Windows then run over every symbol's own observations even when the
+    symbols trade on different calendars. Returns the packed panel, the
+    permutation used and the validity mask.
+    """
+    mask = ~np.isnan(values)
+    order = np.argsort(~mask, axis=0, kind='stable')
+    return np.take_along_axis(values, order, axis=0), order, mask
+
+def unpack_panel(packed: np.ndarray, order: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Inverse of ``pack_panel``; rows without an observation become NaN"""
+    values = np.full_like(packed, np.nan)
+    np.put_along_axis(values, order, packed, axis=0)
+    values[~mask] = np.nan
+    return values
+
+def _rolling_max_drop(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Largest fall max(values[i] - values[j]), i <= j, over every trailing window
+
+    Linear-time block decomposition (van Herk / Gil-Werman): the series is
+    cut into blocks of ``window`` rows, and every window that is not a whole
+    block is the suffix of one block followed by the prefix of the next.
+    Running max/min/drop of the prefixes and suffixes are cumulative
+    maxima, so the whole panel is handled with a few array passes.
+    Rows before the first full window are NaN.
+    """
+    n_rows, n_cols = values.shape
+    result = np.full(values.shape, np.nan)
+    if window > n_rows:
+        return result
+
+    n_blocks = -(-n_rows // window)
+    padded = np.pad(values, ((0, n_blocks * window - n_rows), (0, 0)), mode='edge')
+    blocks = padded.reshape(n_blocks, window, n_cols)
+
+    prefix_max = np.maximum.accumulate(blocks, axis=1)
+    prefix_min = np.minimum.accumulate(blocks, axis=1)
+    prefix_drop = np.maximum.accumulate(prefix_max - blocks, axis=1)
+
+    reverse = blocks[:, ::-1]
+    reverse_min = np.minimum.accumulate(reverse, axis=1)
+    suffix_max = np.maximum.accumulate(reverse, axis=1)[:, ::-1]
+    suffix_drop = np.maximum.accumulate(reverse - reverse_min, axis=1)[:, ::-1]
+
+    prefix_min, prefix_drop = (a.reshape(-1, n_cols) for a in (prefix_min, prefix_drop))
+    suffix_max, suffix_drop = (a.reshape(-1, n_cols) for a in (suffix_max, suffix_drop))
+
+    ends = np.arange(window - 1, n_rows)
+    starts = ends - window + 1
+    spanning = np.maximum(
+        np.maximum(suffix_drop[starts], prefix_drop[ends]),
+        suffix_max[starts] - prefix_min[ends]
+    )
+    aligned = (starts % window == 0)[:, None]
+    result[window - 1:] = np.where(aligned, prefix_drop[ends], spanning)
+    return result
+
+def rolling_max_drawdown(returns: Union[pd.Series, pd.DataFrame],
+                         window: int) -> Union[pd.Series, pd.DataFrame]:
+    """
+    Worst peak-to-trough drawdown of cumulative returns within each window
+
+    Equivalent to ``returns.rolling(window).apply(lambda x:
+    calculate_drawdowns(x).min())`` but O(n) per symbol. Accepts a single
+    series or a dates x symbols frame; windows containing NaN are NaN.
+    """
+    values = returns.to_numpy(dtype=np.float64)
+    one_dimensional = values.ndim == 1
+    if one_dimensional:
+        values = values[:, None]
+
+    missing = np.isnan(values)
+    log_wealth = np.cumsum(np.log1p(np.where(missing, 0.0, values)), axis=0)
+    drawdown = np.expm1(-_rolling_max_drop(log_wealth, window))
+
+    # Windows with a missing observation have no drawdown, as with rolling()
+    missing_count = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(missing, axis=0)])
+    if window <= values.shape[0]:
+        has_missing = np.zeros(values.shape, dtype=bool)
+        has_missing[window - 1:] = (missing_count[window:] - missing_count[:-window]) > 0
+        drawdown[has_missing] = np.nan
+
+    if one_dimensional:
+        return pd.Series(drawdown[:, 0], index=returns.index, name=returns.name)
+    return pd.DataFrame(drawdown, index=returns.index, columns=returns.columns)
+
+class RollingStatsEngine:
+    STATS = ('mean', 'std', 'quantile', 'drawdown', 'max_drawdown')
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Rolling statistics for many symbols and windows in one pass
+
+        Parameters:
+        -----------
+        max_entries : int
+            Number of (symbols, window, statistic, data version) results
+            kept in the least-recently-used memo
+
+        Means and standard deviations come from differences of cumulative
+        sums, drawdowns from the cumulative log-wealth (a rolling peak, or
+        ``_rolling_max_drop`` for max drawdowns), so every extra window costs O(dates x symbols). Quantiles run over
+        the whole packed panel in one pandas call.
+
+        Windows span each symbol's own observations: a missing value is
+        skipped, not a hole (symbols trade on different calendars), and
+        dates without an observation are NaN. A symbol's column therefore
+        matches ``Series.dropna().rolling(window)`` with the default
+        ``min_periods=window``, reindexed to the dates; that equals
+        ``Series.rolling(window)`` only when nothing is missing inside
+        the series (``rolling_max_drawdown`` instead gives NaN windows).
+        """
+        self.max_entries = max_entries
+        self._memo: 'OrderedDict[tuple, pd.DataFrame]' = OrderedDict()
+
+    def compute(self,
+                returns: pd.DataFrame,
+                windows: Iterable[int],
+                stats: Sequence[str] = ('mean', 'std'),
+                quantiles: Sequence[float] = (0.05,),
+                version: Optional[str] = None) -> Dict[int, Dict[str, pd.DataFrame]]:
+        """
+        Compute rolling statistics of a dates x symbols returns frame
+
+        Parameters:
+        -----------
+        returns : pd.DataFrame
+            Returns per symbol; NaN marks a missing observation
+        windows : Iterable[int]
+            Window lengths in observations
+        stats : Sequence[str]
+            Any of 'mean', 'std', 'quantile', 'drawdown', 'max_drawdown'.
+            Drawdown is measured from the highest cumulative wealth within
+            the window; max drawdown is the worst peak-to-trough fall
+            within the window.
+        quantiles : Sequence[float]
+            Levels computed when 'quantile' is requested
+        version : str, optional
+            Data version used for memoization (default: a fingerprint of
+            ``returns``)
+
+        Returns:
+        --------
+        Dict[int, Dict[str, pd.DataFrame]]
+            ``result[window][stat]`` with quantiles keyed 'quantile_<q>'
+        """
+        unknown = set(stats) - set(self.STATS)
+        if unknown:
+            raise ValueError(f"Unknown rolling statistics: {sorted(unknown)}")
+
+        version = version or data_version(returns)
+        columns = tuple(returns.columns)
+
+        names = [stat for stat in stats if stat != 'quantile']
+        if 'quantile' in stats:
+            names += [f'quantile_{q:g}' for q in quantiles]
+
+        results = {}
+        missing = []
+        for window in windows:
+            results[window] = {}
+            for name in names:
+                key = (columns, window, name, version)
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    results[window][name] = self._memo[key]
+                else:
+                    missing.append((window, name))
+
+        if missing:
+            for (window, name), values in self._compute(returns, missing).items():
+                frame = pd.DataFrame(values, index=returns.index, columns=returns.columns)
+                self._store((columns, window, name, version), frame)
+                results[window][name] = frame
+
+        return results
+
+    def rolling(self,
+                returns: pd.DataFrame,
+                window: int,
+                stat: str,
+                version: Optional[str] = None) -> pd.DataFrame:
+        """Single statistic for a single window"""
+        if stat.startswith('quantile_'):
+            result = self.compute(returns, [window], ('quantile',),
+                                  quantiles=(float(stat[len('quantile_'):]),), version=version)
+        else:
+            result = self.compute(returns, [window], (stat,), version=version)
+        return result[window][stat]
+
+    def clear(self):
+        self._memo.clear()
+
+    def _store(self, key: tuple, frame: pd.DataFrame):
+        self._memo[key] = frame
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+
+    def _compute(self, returns: pd.DataFrame, requests) -> Dict[tuple, np.ndarray]:
+        """Shared cumulative sums for every requested (window, statistic)"""
+        packed, order, mask = pack_panel(returns.to_numpy(dtype=np.float64))
+        n_rows = packed.shape[0]
+        counts = mask.sum(axis=0)
+        rows = np.arange(n_rows)[:, None]
+        names = {name for _, name in requests}
+
+        # Centering keeps the sum-of-squares variance numerically stable
+        center = np.nansum(packed, axis=0) / np.maximum(counts, 1)
+        centered = np.nan_to_num(packed - center)
+        zeros = np.zeros((1, packed.shape[1]))
+        cum_sum = np.vstack([zeros, np.cumsum(centered, axis=0)])
+        cum_sq = np.vstack([zeros, np.cumsum(centered ** 2, axis=0)]) if 'std' in names else None
+        log_wealth = (np.cumsum(np.log1p(np.nan_to_num(packed)), axis=0)
+                      if names & {'drawdown', 'max_drawdown'} else None)
+
+        output = {}
+        for window, name in requests:
+            values = np.full(packed.shape, np.nan)
+            if window <= n_rows:
+                if name == 'mean':
+                    sums = cum_sum[window:] - cum_sum[:-window]
+                    values[window - 1:] = sums / window + center
+                elif name == 'std':
+                    sums = cum_sum[window:] - cum_sum[:-window]
+                    squares = cum_sq[window:] - cum_sq[:-window]
+                    variance = (squares - sums ** 2 / window) / (window - 1) if window > 1 else np.nan
+                    values[window - 1:] = np.sqrt(np.maximum(variance, 0))
+                elif name == 'drawdown':
+                    peak = pd.DataFrame(log_wealth).rolling(window=window).max().to_numpy()
+                    values = np.expm1(log_wealth - peak)
+                elif name == 'max_drawdown':
+                    values = np.expm1(-_rolling_max_drop(log_wealth, window))
+                else:
+                    q = float(name[len('quantile_'):])
+                    # A copy: with copy-on-write, to_numpy() may be a read-only view
+                    values = pd.DataFrame(packed).rolling(window=window).quantile(q).to_numpy(copy=True)
+
+            # Windows must lie within each symbol's observations
+            values[(rows < window - 1) | (rows >= counts)] = np.nan
+            output[(window, name)] = unpack_panel(values, order, mask)
+
+        return output
+
+class RollingQuantile:
+    def __init__(self, window: int, quantiles: Sequence[float] = (0.05,)):
+        """
+        Streaming quantiles of the last ``window`` observations
+
+        Parameters:
+        -----------
+        window : int
+            Number of observations in the window
+        quantiles : Sequence[float]
+            Levels returned by every update
+
+        The window is kept sorted, so a new observation costs one bisect
+        insert and one delete and every quantile is read in O(1), with the
+        same linear interpolation as ``Series.rolling(window).quantile``.
+        """
+        self.window = window
+        self.quantiles = tuple(quantiles)
+        self._values = deque()
+        self._sorted = []
+        self._missing = 0
+
+    def update(self, value: float) -> Dict[float, float]:
+        """Add an observation and return the quantiles of the current window"""
+        self._values.append(value)
+        if np.isnan(value):
+            self._missing += 1
+        else:
+            bisect.insort(self._sorted, value)
+
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if np.isnan(old):
+                self._missing -= 1
+            else:
+                del self._sorted[bisect.bisect_left(self._sorted, old)]
+
+        return {q: self.quantile(q) for q in self.quantiles}
+
+    def quantile(self, q: float) -> float:
+        """Quantile of the current window (NaN until the window is full)"""
+        if self._missing or len(self._values) < self.window:
+            return np.nan
+
+        position = q * (len(self._sorted) - 1)
+        lower = int(np.floor(position))
+        upper = min(lower + 1, len(self._sorted) - 1)
+        fraction = position - lower
+        return self._sorted[lower] + (self._sorted[upper] - self._sorted[lower]) * fraction
+
+class VaRBreachMonitor:
+    def __init__(self, window: int = 252, var_percentiles: Sequence[float] = (0.95, 0.99, 0.995)):
+        """
+        Bar-by-bar historical VaR and breach tracking for several percentiles
+
+        A return is a breach when it falls below the rolling
+        ``1 - percentile`` quantile of the window that includes it, as in
+        ``calculate_var_breaches`` (the faster choice for a whole history).
+        """
+        self.var_percentiles = tuple(var_percentiles)
+        self._quantiles = RollingQuantile(window, [1 - p for p in self.var_percentiles])
+        self.cumulative_breaches = {p: 0 for p in self.var_percentiles}
+
+    def seed(self, returns: Sequence[float], cumulative_breaches: Optional[Dict[float, int]] = None):
+        """Load history without scanning it: the last ``window`` returns and the breach counts so far"""
+        for ret in returns[-self._quantiles.window:]:
+            self._quantiles.update(ret)
+        if cumulative_breaches is not None:
+            self.cumulative_breaches.update(cumulative_breaches)
+
+    def update(self, ret: float) -> Dict[float, Tuple[float, bool]]:
+        """Add a return and get (VaR, breach) per percentile"""
+        levels = self._quantiles.update(ret)
+        result = {}
+        for percentile in self.var_percentiles:
+            var = levels[1 - percentile]
+            breach = bool(ret < var)
+            self.cumulative_breaches[percentile] += breach
+            result[percentile] = (var, breach)
+        return result
+
+# Shared by the dashboard, MarketData and the helper functions so that the
+# same window over the same data is computed only once per page
+rolling_engine = RollingStatsEngine()
@@ -0,0 +1,61 @@
+# utils/runs.py
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, Union
+
+@dataclass
+class RunLengths:
+    persistence: pd.DataFrame  # Days into the current run, 0 outside runs, per mask
+    runs: pd.DataFrame         # One row per run: mask, start, end, length, start_date, end_date
+
+def run_lengths(masks: Union[pd.Series, pd.DataFrame, Dict[str, pd.Series]]) -> RunLengths:
+    """
+    Run-length encode one or more boolean masks in one vectorized pass
+
+    Parameters:
+    -----------
+    masks : pd.Series, pd.DataFrame or Dict[str, pd.Series]
+        Boolean masks on a shared index, one column per mask
+
+    Returns:
+    --------
+    RunLengths
+        ``persistence`` counts how many consecutive True values end at each
+        row (the old per-element loop); ``runs`` lists every run with its
+        positional start/end (inclusive) and length, ordered by mask then
+        time, so persistent runs can be selected with a single filter.
+    """
+    if isinstance(masks, pd.Series):
+        masks = masks.to_frame(masks.name if masks.name is not None else 'mask')
+    elif isinstance(masks, dict):
+        masks = pd.DataFrame(masks)
+
+    values = masks.fillna(False).to_numpy(dtype=bool)
+    rows = np.arange(values.shape[0])[:, None]
+
+    # Distance to the most recent False (or to before the start)
+    last_false = np.maximum.accumulate(np.where(values, -1, rows), axis=0)
+    persistence = np.where(values, rows - last_false, 0)
+
+    previous = np.vstack([np.zeros((1, values.shape[1]), dtype=bool), values[:-1]])
+    following = np.vstack([values[1:], np.zeros((1, values.shape[1]), dtype=bool)])
+
+    # Transposed so runs come out grouped by mask, then in time order
+    mask_ids, starts = np.nonzero((values & ~previous).T)
+    _, ends = np.nonzero((values & ~following).T)
+
+    runs = pd.DataFrame({
+        'mask': masks.columns[mask_ids],
+        'start': starts,
+        'end': ends,
+        'length': ends - starts + 1,
+        'start_date': masks.index[starts],
+        'end_date': masks.index[ends]
+    })
+
+    return RunLengths(
+        persistence=pd.DataFrame(persistence, index=masks.index, columns=masks.columns),
+        runs=runs
+    )
@@ -7,6 +7,8 @@ import pandas as pd
 import numpy as np
 from typing import Dict
 
+from utils.rolling import rolling_engine
+
 class VolatilityDashboard:
     def __init__(self, market_data, analyzers, portfolio_manager):
         self.market_data = market_data
@@ -142,11 +144,12 @@ class VolatilityDashboard:
         
         # Calculate rolling risk metrics
         window = 252  # One year
+        stats = rolling_engine.compute(data[['Returns']], [window])[window]
+        volatility = stats['std']['Returns'] * np.sqrt(252)
         rolling_data = pd.DataFrame({
             'Returns': data['Returns'],
-            'Volatility': data['Returns'].rolling(window=window).std() * np.sqrt(252),
-            'Sharpe': (data['Returns'].rolling(window=window).mean() * 252) / 
-                     (data['Returns'].rolling(window=window).std() * np.sqrt(252))
+            'Volatility': volatility,
+            'Sharpe': (stats['mean']['Returns'] * 252) / volatility
         })
         
         # Create metrics plot
@@ -5,10 +5,12 @@ from plotly.subplots import make_subplots
 import plotly.express as px
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+from analysis.regime import RegimeRuns
+
 class VolatilityPlots:
     def __init__(self, 
                  height: int = 600, 
@@ -449,9 +451,14 @@ class VolatilityPlots:
         return fig
 
     def plot_regime_transitions(self,
-                              regime_changes: pd.Series,
+                              regime_changes: Union[pd.Series, RegimeRuns],
                               returns: pd.Series) -> go.Figure:
-        """Plot regime transitions with returns"""
+        """Plot regime transitions with returns
+        
+        ``regime_changes`` may be the regime series or the ``RegimeRuns``
+        computed by ``RegimeDetector``; runs are drawn as one step per run
+        and the transition counts are shown in the title.
+        """
         fig = make_subplots(
             rows=2,
             cols=1,
@@ -472,22 +479,30 @@ class VolatilityPlots:
         )
         
         # Plot regime changes
-        fig.add_trace(
-            go.Scatter(
+        title = 'Regime Transitions'
+        if isinstance(regime_changes, RegimeRuns):
+            runs = regime_changes.runs
+            counts = regime_changes.transition_counts.to_numpy()
+            switches = int(counts.sum() - np.trace(counts))
+            title = f'Regime Transitions ({switches} switches)'
+            x = list(runs['start_date']) + list(runs['end_date'].iloc[-1:])
+            y = list(runs['regime']) + list(runs['regime'].iloc[-1:])
+            regime_trace = go.Scatter(x=x, y=y, name='Regime', line=dict(color='red', shape='hv'))
+        else:
+            regime_trace = go.Scatter(
                 x=regime_changes.index,
                 y=regime_changes,
                 name='Regime',
                 line=dict(color='red')
-            ),
-            row=2, col=1
-        )
+            )
+        fig.add_trace(regime_trace, row=2, col=1)
         
         fig.update_layout(
             height=self.height,
             width=self.width,
             template=self.template,
             showlegend=True,
-            title='Regime Transitions'
+            title=title
         )
         
         return fig
\ No newline at end of file